@@ -1,25 +1,36 @@
 import json
 import re
+import time
+import asyncio
 import uvicorn
-import requests
 
 from pytz import timezone
 from typing import Optional
 from dateutil.parser import isoparse
-from requests.auth import HTTPBasicAuth
-from contextlib import asynccontextmanager
-
-from modules import database, github, techAI             # Módulos de la aplicación
+from contextlib import asynccontextmanager, aclosing
+
+from modules import database, github, gitea, techAI      # Módulos de la aplicación
+from modules import monitor, metrics                     # Vigilante del event loop y métricas
+from modules import admission                            # Control de admisión de rutas con LLM
+from modules import llm_cache, llm_client                # Caché y cliente del LLM
+from modules import http_client                          # Cliente HTTP compartido
+from modules import source_schedule                      # Programación adaptativa de fuentes
 from modules.config import settings                      # Configuración de la aplicación
 from modules.config import tags_metadata, Tags           # Rutas Tags del Swagger
 from modules.config import LOGGING_CONFIG, log_main      # Configuración de logging
 from modules.config import OrderField, OrderDirection    # Ordenación de los repositorios
+from modules.config import PostMode                      # Modo de generación de posts
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
-from fastapi import FastAPI, Query, HTTPException
+from fastapi import FastAPI, Query, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import PlainTextResponse, JSONResponse
+from fastapi.responses import PlainTextResponse, JSONResponse, StreamingResponse
+
+
+def _job(func, name: str):
+    # Los jobs quedan medidos y nombrados para el vigilante del event loop
+    return monitor.job(metrics.job(func, name), name)
 
 
 @asynccontextmanager
@@ -27,10 +38,12 @@ async def lifespan(app: FastAPI):
     # ------ Schedule Setup ------
     scheduler = AsyncIOScheduler(timezone=timezone("Europe/Madrid"))
 
+    # Con feeds locales y programación adaptativa el job es diario y cada fuente se lee cuando le toca;
+    # con búsqueda web cada ejecución cuesta llamadas al LLM y se mantiene semanal
     scheduler.add_job(
-        search_news,
+        _job(search_news, 'search_news_job'),
         'cron',
-        day_of_week='sun',
+        day_of_week='*' if source_schedule.ENABLED and techAI.LOCAL_FEEDS else 'sun',
         hour=0,
         minute=0,
         id='search_news_job',
@@ -38,7 +51,7 @@ async def lifespan(app: FastAPI):
         misfire_grace_time=600)
 
     scheduler.add_job(
-        update_repos,
+        _job(update_repos, 'update_repos_job'),
         'cron',
         hour=23,
         minute=0,
@@ -46,7 +59,7 @@ async def lifespan(app: FastAPI):
     )
 
     scheduler.add_job(
-        update_all_posts,
+        _job(update_all_posts, 'update_all_posts_job'),
         'cron',
         day_of_week='wed',
         hour=0,
@@ -56,12 +69,26 @@ async def lifespan(app: FastAPI):
         misfire_grace_time=600
     )
 
+    if techAI.BATCH_ENABLED:
+        scheduler.add_job(
+            _job(collect_news_batches, 'collect_news_batches_job'),
+            'interval',
+            seconds=techAI.BATCH_DATA.get('poll_interval', 600),
+            id='collect_news_batches_job',
+            replace_existing=True,
+            max_instances=1
+        )
+
     scheduler.start()
+    monitor.start()
     try:
         yield
 
     finally:
+        monitor.stop()
+        await gitea.shutdown()
         scheduler.shutdown(wait=False)
+        await http_client.aclose()
 
 
 # ------ FastAPI Setup ------
@@ -82,37 +109,116 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# ------ Gitea config ------
-GITEA_DATA   = settings['GITEA']
-GITEA_URL    = GITEA_DATA['url']
-GITEA_USER   = GITEA_DATA['user']
-GITEA_TOKEN  = GITEA_DATA['token']
-GITEA_BLOG   = GITEA_DATA['blog']
-GITEA_NEWS   = GITEA_DATA['news']
-
+# ------ Observability ------
+app.add_middleware(monitor.ActivityMiddleware)
+app.add_middleware(metrics.MetricsMiddleware)
 
 # ------ UTILS ------
-async def generate_post_logic(data: dict, pipeline) -> database.Posts | None:
+NDJSON = "application/x-ndjson"
+
+# Posts regenerados en paralelo por update_all_posts (ajustar a la cuota de OpenAI)
+POST_CONCURRENCY = settings['OPENAI'].get('post_concurrency', 3)
+
+# Modo por defecto del job programado y de las rutas de posts
+POST_MODE = PostMode(settings['OPENAI'].get('post_mode', PostMode.full.value))
+POST_PIPELINES = {PostMode.full: techAI.Pipeline.POST, PostMode.fast: techAI.Pipeline.FAST_POST}
+
+
+def save_news_items(news: list, reason: str):
+    for item in news:
+        save_news = database.News(
+            source_id=item["source_id"],
+            title=item["title"],
+            introduction=item["introduction"],
+            content=item["content"],
+            published_at=isoparse(item["date"]),
+            url=item["url"]
+        )
+
+        database.save_news(save_news)
+
+    gitea.request_rebuild("news", reason)
+
+
+def repo_to_json(repo: database.Repos) -> dict:
+    return {
+        "id": repo.id,
+        "name": repo.name,
+        "description": repo.description,
+        "url": repo.url,
+        "language": repo.language,
+        "stars": repo.stars,
+        "forks": repo.forks,
+        "watchers": repo.watchers,
+        "views": repo.views,
+        "unique_views": repo.unique_views,
+        "clones": repo.clones,
+        "unique_clones": repo.unique_clones,
+        "created_at": repo.created_at.isoformat(),
+        "updated_at": repo.updated_at.isoformat(),
+    }
+
+
+def wants_stream(request: Request, stream: bool) -> bool:
+    return stream or NDJSON in request.headers.get("accept", "")
+
+
+def ndjson_response(rows) -> StreamingResponse:
+    # Generador síncrono: Starlette lo recorre en el threadpool, fuera del event loop
+    def lines():
+        for row in rows:
+            yield json.dumps(row, ensure_ascii=False, default=lambda value: value.isoformat()) + "\n"
+
+    return StreamingResponse(lines(), media_type=NDJSON)
+
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class ClosingStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse que cierra el generador y ejecuta `on_close` al terminar la respuesta,
+    también si el cliente se desconecta o el cuerpo nunca llega a recorrerse.
+    """
+
+    def __init__(self, content, on_close, **kwargs):
+        super().__init__(content, **kwargs)
+        self.on_close = on_close
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+
+        finally:
+            await self.body_iterator.aclose()
+            self.on_close()
+
+
+def build_post(data: dict, response: str) -> database.Posts:
+    markdown_pattern = re.compile(r'```markdown\n(.*?)```', re.DOTALL)
+    post = ''.join(markdown_pattern.findall(response)) or response
+
+    return database.Posts(
+        id=data["id"],
+        title=data["name"],
+        description=data["description"],
+        created_at=isoparse(data["created_at"]),
+        updated_at=isoparse(data["updated_at"]),
+        article=post
+    )
+
+
+async def generate_post_logic(data: dict, pipeline, no_cache: bool = False,
+                              mode: PostMode = POST_MODE) -> database.Posts | None:
     try:
         log_main.info(f"Generando post para repositorio {data['name']}...")
 
-        response = await techAI.gen_post(data, mode=pipeline)
+        response = await techAI.gen_post(data, mode=pipeline, no_cache=no_cache, post_mode=POST_PIPELINES[mode])
         if response is None:
             return response
 
-        markdown_pattern = re.compile(r'```markdown\n(.*?)```', re.DOTALL)
-        post = ''.join(markdown_pattern.findall(response)) or response
-
-        new_post = database.Posts(
-            id=data["id"],
-            title=data["name"],
-            description=data["description"],
-            created_at=isoparse(data["created_at"]),
-            updated_at=isoparse(data["updated_at"]),
-            article=post
-        )
-
-        return new_post
+        return build_post(data, response)
 
     except Exception as e:
         log_main.error(f"Error generating post for repository {data['name']}: {e}")
@@ -128,6 +234,39 @@ async def health():
     return "ok"
 
 
+@app.get("/diagnostics/loop", tags=[Tags.state], summary="Event loop lag",
+         description="Returns event loop lag percentiles and the latest blocking handlers detected.")
+async def get_loop_diagnostics():
+    return monitor.lag_stats()
+
+
+@app.get("/stats/llm", tags=[Tags.state], summary="LLM usage per pipeline step",
+         description="Aggregates recorded OpenAI calls by step and ISO week: p50/p95 latency, retries and token totals. "
+                     "`pipelines` compares completed runs (e.g. POST vs FAST_POST) by duration, calls and tokens per run.")
+async def get_llm_stats(weeks: int = Query(4, ge=1, le=52, description="Weeks of history to aggregate")):
+    return await asyncio.to_thread(llm_client.report, weeks)
+
+
+@app.get("/stats/llm/cache", tags=[Tags.state], summary="LLM cache statistics",
+         description="Returns hit rate and saved tokens of the LLM response cache per pipeline step.")
+async def get_llm_cache_stats():
+    return llm_cache.stats()
+
+
+@app.get("/stats/llm/pacing", tags=[Tags.state], summary="LLM retry and pacing statistics",
+         description="Returns OpenAI retries, backoff, RPM/TPM pacing waits, deadline cancellations and hedges per pipeline step.")
+async def get_llm_pacing_stats():
+    return llm_client.stats()
+
+
+@app.get("/metrics", tags=[Tags.state],
+         response_class=PlainTextResponse,
+         summary="Prometheus metrics",
+         description="Exposes route, job, upstream and database metrics in Prometheus text format.")
+async def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 # ------ GITHUB USER ENDPOINTS ------
 @app.get("/github-user", tags=[Tags.github], summary="Get GitHub user data",
          description="Fetches and returns the GitHub user data.")
@@ -206,6 +345,7 @@ async def get_github_orgs_data():
 @app.get("/repos", tags=[Tags.repos], summary="Get all database repositories",
          description="Returns a list of all repositories stored in the database.",)
 async def get_repos(
+    request: Request,
     order_by: Optional[OrderField] = Query(
         default=None,
         description="Campo por el que ordenar"
@@ -214,8 +354,21 @@ async def get_repos(
         default=OrderDirection.asc,
         description="Dirección de ordenación (asc o desc)"
     ),
+    stream: bool = Query(
+        default=False,
+        description="Devuelve NDJSON en streaming (también con Accept: application/x-ndjson)"
+    ),
 ):
     try:
+        if wants_stream(request, stream):
+            if order_by is None:
+                return ndjson_response(database.iter_repos())
+
+            return ndjson_response(database.iter_repos(
+                order_by=order_by.value,
+                desc=(direction == OrderDirection.desc)
+            ))
+
         if order_by is None:
             return database.get_repos()
 
@@ -316,6 +469,7 @@ async def delete_repo(repo_id: int):
 @app.get("/posts", tags=[Tags.post], summary="Get all posts",
          description="Returns a list of all posts stored in the database.")
 async def get_posts(
+    request: Request,
     order_by: Optional[OrderField] = Query(
         default=None,
         description="Campo por el que ordenar"
@@ -324,8 +478,21 @@ async def get_posts(
         default=OrderDirection.asc,
         description="Dirección de ordenación (asc o desc)"
     ),
+    stream: bool = Query(
+        default=False,
+        description="Devuelve NDJSON en streaming (también con Accept: application/x-ndjson)"
+    ),
 ):
     try:
+        if wants_stream(request, stream):
+            if order_by is None:
+                return ndjson_response(database.iter_posts())
+
+            return ndjson_response(database.iter_posts(
+                order_by=order_by.value,
+                desc=(direction == OrderDirection.desc)
+            ))
+
         if order_by is None:
             return database.get_posts()
 
@@ -367,9 +534,10 @@ async def get_post(repo_id: int):
 
 
 @app.put("/posts/update_all", tags=[Tags.post], summary="Update all post",
-         description="Updates all existing posts in the database based on the latest repository data.")
-async def update_all_posts():
-    log_main.info(f"Actualizando todos los posts...")
+         description="Updates all existing posts in the database based on the latest repository data.",
+         dependencies=[Depends(admission.limit("post_update_all"))])
+async def update_all_posts(mode: PostMode = POST_MODE):
+    log_main.info(f"Actualizando todos los posts ({mode.value})...")
 
     try:
         repos = database.get_repos()
@@ -378,50 +546,59 @@ async def update_all_posts():
             return {"error": "No repositories found"}
 
 
-        update = False
-        count = 1
-        for repo in repos:
-            log_main.info(f"{count}/{len(repos)} Repositorio {repo.id} - {repo.name}")
-            repo_json = {
-                "id": repo.id,
-                "name": repo.name,
-                "description": repo.description,
-                "url": repo.url,
-                "language": repo.language,
-                "stars": repo.stars,
-                "forks": repo.forks,
-                "watchers": repo.watchers,
-                "views": repo.views,
-                "unique_views": repo.unique_views,
-                "clones": repo.clones,
-                "unique_clones": repo.unique_clones,
-                "created_at": repo.created_at.isoformat(),
-                "updated_at": repo.updated_at.isoformat(),
-            }
+        semaphore = asyncio.Semaphore(POST_CONCURRENCY)
 
-            pipeline = techAI.Pipeline.EVAL
-            post = await generate_post_logic(repo_json, pipeline)
+        async def regenerate(index: int, repo: database.Repos) -> dict:
+            async with semaphore:
+                log_main.info(f"{index}/{len(repos)} Repositorio {repo.id} - {repo.name}")
+                start = time.perf_counter()
+                result = {"id": repo.id, "name": repo.name, "status": "unchanged"}
 
-            if post is not None:
-                database.update_post(post)
-                update = True
+                try:
+                    post = await generate_post_logic(repo_to_json(repo), techAI.Pipeline.EVAL, mode=mode)
 
-            count += 1
+                    # Se persiste en cuanto está listo, sin esperar al resto
+                    if post is not None:
+                        database.update_post(post)
+                        result["status"] = "updated"
 
-        if update:
-            log_main.info("Se han realizado cambios en la base de datos")
-            log_main.info("Reconstruyendo BlogPage...")
+                except Exception as e:
+                    result["status"] = "failed"
+                    result["error"] = str(e)
 
-            url = f"{GITEA_URL}/job/{GITEA_BLOG}/job/main/build"
-            response = requests.post(url, auth=HTTPBasicAuth(GITEA_USER, GITEA_TOKEN))
+                result["duration"] = round(time.perf_counter() - start, 2)
+                return result
 
-            if response.status_code == 201:
-                log_main.info("BlogPage reconstruido correctamente.")
+        start = time.perf_counter()
+        results = await asyncio.gather(*(regenerate(i, repo) for i, repo in enumerate(repos, start=1)))
 
-            else:
-                log_main.error(f"Error al reconstruir BlogPage: {response.status_code} - {response.text}")
+        durations = sorted(result["duration"] for result in results)
+        failures = [result for result in results if result["status"] == "failed"]
+        update = any(result["status"] == "updated" for result in results)
+
+        summary = {
+            "total": len(results),
+            "updated": sum(result["status"] == "updated" for result in results),
+            "unchanged": sum(result["status"] == "unchanged" for result in results),
+            "failed": len(failures),
+            "elapsed": round(time.perf_counter() - start, 2),
+            "slowest": durations[-1],
+            "median": durations[len(durations) // 2],
+            "failures": [{"id": f["id"], "name": f["name"], "error": f["error"]} for f in failures],
+        }
+
+        log_main.info(
+            f"Posts procesados: {summary['total']} en {summary['elapsed']}s "
+            f"({summary['updated']} actualizados, {summary['unchanged']} sin cambios, {summary['failed']} fallidos)."
+        )
+        for failure in failures:
+            log_main.error(f"Fallo en repositorio {failure['name']}: {failure['error']}")
+
+        if update:
+            log_main.info("Se han realizado cambios en la base de datos")
+            gitea.request_rebuild("blog", "update_all_posts")
 
-        return {"message": "All posts updated successfully"}
+        return {"message": "All posts updated successfully", "summary": summary}
 
     except Exception as e:
         log_main.error(f"Error updating all posts: {e}")
@@ -429,33 +606,30 @@ async def update_all_posts():
 
 
 @app.put("/posts/{repo_id}", tags=[Tags.post], summary="Update post",
-         description="Updates an existing post for a specific repository by its ID if it exists.")
-async def update_post(repo_id: int):
+         description="Updates an existing post for a specific repository by its ID if it exists.",
+         dependencies=[Depends(admission.limit("post_update"))])
+async def update_post(
+    repo_id: int,
+    no_cache: bool = Query(
+        default=False,
+        description="Ignora la caché de respuestas del LLM"
+    ),
+    mode: PostMode = Query(
+        default=POST_MODE,
+        description="full: pipeline de cuatro pasos; fast: una llamada estructurada y corrector local"
+    ),
+):
     try:
         log_main.info(f"Actualizando post para repositorio {repo_id}...")
 
         repo = database.get_repo(repo_id)
-        repo_json = {
-            "id": repo.id,
-            "name": repo.name,
-            "description": repo.description,
-            "url": repo.url,
-            "language": repo.language,
-            "stars": repo.stars,
-            "forks": repo.forks,
-            "watchers": repo.watchers,
-            "views": repo.views,
-            "unique_views": repo.unique_views,
-            "clones": repo.clones,
-            "unique_clones": repo.unique_clones,
-            "created_at": repo.created_at.isoformat(),
-            "updated_at": repo.updated_at.isoformat(),
-        }
+        repo_json = repo_to_json(repo)
 
         if repo:
-            pipeline = techAI.Pipeline.POST
-            post = await generate_post_logic(repo_json, pipeline)
+            pipeline = POST_PIPELINES[mode]
+            post = await generate_post_logic(repo_json, pipeline, no_cache=no_cache)
             database.update_post(post)
+            gitea.request_rebuild("blog", "update_post")
 
             return {"message": "Post updated successfully"}
 
@@ -468,32 +642,29 @@ async def update_post(repo_id: int):
 
 
 @app.post("/posts/{repo_id}", tags=[Tags.post], response_class=JSONResponse,summary="Generate and save a new post",
-         description="Generates a new post based on the provided repository data and saves it to the database if it does not already exist.")
-async def gen_post(repo_id: int):
+         description="Generates a new post based on the provided repository data and saves it to the database if it does not already exist.",
+         dependencies=[Depends(admission.limit("post_create"))])
+async def gen_post(
+    repo_id: int,
+    no_cache: bool = Query(
+        default=False,
+        description="Ignora la caché de respuestas del LLM"
+    ),
+    mode: PostMode = Query(
+        default=POST_MODE,
+        description="full: pipeline de cuatro pasos; fast: una llamada estructurada y corrector local"
+    ),
+):
     try:
         repo = database.get_repo(repo_id)
-        repo_json = {
-            "id": repo.id,
-            "name": repo.name,
-            "description": repo.description,
-            "url": repo.url,
-            "language": repo.language,
-            "stars": repo.stars,
-            "forks": repo.forks,
-            "watchers": repo.watchers,
-            "views": repo.views,
-            "unique_views": repo.unique_views,
-            "clones": repo.clones,
-            "unique_clones": repo.unique_clones,
-            "created_at": repo.created_at.isoformat(),
-            "updated_at": repo.updated_at.isoformat(),
-        }
+        repo_json = repo_to_json(repo)
 
-        pipeline = techAI.Pipeline.POST
-        new_post = await generate_post_logic(repo_json, pipeline)
+        pipeline = POST_PIPELINES[mode]
+        new_post = await generate_post_logic(repo_json, pipeline, no_cache=no_cache)
 
         if database.get_post(repo_id) is None:
             database.save_post(new_post)
+            gitea.request_rebuild("blog", "gen_post")
 
         return {"message": "Post create successfully"}
 
@@ -502,12 +673,82 @@ async def gen_post(repo_id: int):
         return {"error": str(e)}
 
 
+@app.post("/posts/{repo_id}/stream", tags=[Tags.post], summary="Generate a post with live progress",
+          description="Runs the post pipeline streaming Server-Sent Events: one `step` event per finished step, "
+                      "`delta` events with the article text as it is written and polished, and a final `done` "
+                      "event once the post is saved. Failures are reported as an `error` event.",
+          response_class=StreamingResponse)
+async def stream_post(
+    repo_id: int,
+    no_cache: bool = Query(
+        default=False,
+        description="Ignora la caché de respuestas del LLM"
+    ),
+):
+    repo = database.get_repo(repo_id)
+    if repo is None:
+        raise HTTPException(status_code=404, detail="Repository not found")
+
+    # El hueco se retiene hasta que termina el stream, no solo hasta enviar las cabeceras
+    repo_json = repo_to_json(repo)
+    limiter = admission.get_limiter("post_create")
+    started = await limiter.acquire()
+    released = False
+
+    def release():
+        nonlocal released
+        if not released:
+            released = True
+            limiter.release(started)
+
+    async def events():
+        try:
+            async with aclosing(techAI.stream_post(repo_json, no_cache=no_cache)) as stream:
+                async for event, data in stream:
+                    if event != "done":
+                        yield sse_event(event, data)
+                        continue
+
+                    new_post = build_post(repo_json, data["article"])
+                    if database.get_post(repo_id) is None:
+                        database.save_post(new_post)
+
+                    else:
+                        database.update_post(new_post)
+
+                    gitea.request_rebuild("blog", "stream_post")
+                    yield sse_event("done", {"id": repo_id, "article": new_post.article})
+
+        except Exception as e:
+            log_main.error(f"Error streaming post for repository {repo_id}: {e}")
+            yield sse_event("error", {"error": str(e)})
+
+        finally:
+            release()
+
+    return ClosingStreamingResponse(
+        events(),
+        on_close=release,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 # ------ NEWS ENDPOINTS ------
 @app.get("/news", tags=[Tags.news], summary="Get all news",
          description="Returns a list of all news articles stored in the database.")
-async def get_news():
+async def get_news(
+    request: Request,
+    stream: bool = Query(
+        default=False,
+        description="Devuelve NDJSON en streaming (también con Accept: application/x-ndjson)"
+    ),
+):
     log_main.info("Obteniendo todas las noticias...")
     try:
+        if wants_stream(request, stream):
+            return ndjson_response(database.iter_news())
+
         news = database.get_news()
         if news:
             return news
@@ -568,26 +809,62 @@ async def search_news():
 
     try:
         news = await techAI.get_news(mode=techAI.Pipeline.NEWS)
+        # Con la Batch API el pipeline devuelve el ID del lote enviado
+        if isinstance(news, str):
+            return {"message": "News generation submitted as batch", "batch": news}
+
         if not news:
             log_main.warning("No se encontraron noticias.")
             return {"error": "No news found"}
 
-        for item in news:
-            save_news = database.News(
-                source_id=item["source_id"],
-                title=item["title"],
-                introduction=item["introduction"],
-                content=item["content"],
-                published_at=isoparse(item["date"]),
-                url=item["url"]
-            )
+        save_news_items(news, "search_news")
+        return {"news": news}
 
-            database.save_news(save_news)
+    except Exception as e:
+        log_main.error(f"Error fetching news: {e}")
+        return {"error": str(e)}
+
+
+@app.post("/search_news/batches", tags=[Tags.news], summary="Collect news batches",
+          description="Collects finished Batch API news generations and saves them.")
+async def collect_news_batches():
+    log_main.info("Recogiendo lotes de noticias...")
+
+    try:
+        news = await techAI.collect_news_batches()
+        if news:
+            save_news_items(news, "collect_news_batches")
 
         return {"news": news}
 
     except Exception as e:
-        log_main.error(f"Error fetching news: {e}")
+        log_main.error(f"Error collecting news batches: {e}")
+        return {"error": str(e)}
+
+
+# ------ BUILDS ENDPOINTS ------
+@app.post("/rebuild/{target}", tags=[Tags.builds], summary="Request site rebuild",
+          description="Queues a rebuild of the blog or news site. Requests within the quiet window are coalesced into one build.")
+async def rebuild(target: str):
+    try:
+        gitea.request_rebuild(target, "manual")
+        return {"message": f"Rebuild of {target} scheduled"}
+
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@app.get("/rebuilds", tags=[Tags.builds], summary="Get rebuild history",
+         description="Returns pending rebuild requests and the latest triggered builds.")
+async def get_rebuilds(limit: int = Query(default=50, ge=1, le=500)):
+    try:
+        return {
+            "pending": gitea.pending(),
+            "history": database.get_rebuilds(limit)
+        }
+
+    except Exception as e:
+        log_main.error(f"Error fetching rebuilds: {e}")
         return {"error": str(e)}
 
 
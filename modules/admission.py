@@ -0,0 +1,123 @@
+import math
+import time
+import asyncio
+
+from fastapi import HTTPException
+
+from modules import metrics
+from modules.config import log_admission, settings
+
+
+ADMISSION_DATA = settings.get('ADMISSION', {})
+
+# Límites por defecto: cada generación de post son 4 llamadas al LLM
+DEFAULTS = {
+    "post_create":  {"concurrency": 2, "queue": 4, "timeout": 30},
+    "post_update":  {"concurrency": 2, "queue": 4, "timeout": 30},
+    "post_update_all": {"concurrency": 1, "queue": 0, "timeout": 0},
+}
+
+
+class Limiter:
+    """
+    Limita la concurrencia de una ruta con una cola de espera acotada.
+    Si la cola está llena o se agota el tiempo de espera responde 429 con Retry-After.
+    """
+
+    def __init__(self, name: str, concurrency: int, queue: int, timeout: float):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue = queue
+        self.timeout = timeout
+
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._waiting = 0
+        self._active = 0
+        self._held = 0.0       # Media móvil del tiempo que se ocupa un hueco
+
+    def _retry_after(self) -> int:
+        # Estimación: turnos por delante multiplicados por la duración media de una ejecución
+        held = self._held or self.timeout or 1
+        turns = (self._waiting + 1) / self.concurrency
+        return max(1, math.ceil(held * turns))
+
+    def _reject(self, reason: str):
+        retry_after = self._retry_after()
+        metrics.ADMISSION_REJECTED.inc(limiter=self.name, reason=reason)
+        log_admission.warning(f"[{self.name}] Petición rechazada ({reason}), reintentar en {retry_after}s.")
+
+        raise HTTPException(
+            status_code=429,
+            detail=f"Too many concurrent requests, retry in {retry_after}s",
+            headers={"Retry-After": str(retry_after)}
+        )
+
+    async def acquire(self):
+        if not self._semaphore.locked():
+            # Hueco libre: se adquiere sin ceder el control al event loop
+            await self._semaphore.acquire()
+            metrics.ADMISSION_WAIT.observe(0, limiter=self.name)
+            return self._admit()
+
+        if self._waiting >= self.queue:
+            self._reject("queue_full")
+
+        self._waiting += 1
+        metrics.ADMISSION_QUEUE.set(self._waiting, limiter=self.name)
+        start = time.perf_counter()
+
+        try:
+            if self.timeout:
+                await asyncio.wait_for(self._semaphore.acquire(), self.timeout)
+
+            else:
+                await self._semaphore.acquire()
+
+        except asyncio.TimeoutError:
+            self._reject("timeout")
+
+        finally:
+            self._waiting -= 1
+            metrics.ADMISSION_QUEUE.set(self._waiting, limiter=self.name)
+            metrics.ADMISSION_WAIT.observe(time.perf_counter() - start, limiter=self.name)
+
+        return self._admit()
+
+    def _admit(self) -> float:
+        self._active += 1
+        metrics.ADMISSION_ACTIVE.set(self._active, limiter=self.name)
+        return time.perf_counter()
+
+    def release(self, started: float):
+        held = time.perf_counter() - started
+        self._held = held if not self._held else 0.8 * self._held + 0.2 * held
+
+        self._active -= 1
+        metrics.ADMISSION_ACTIVE.set(self._active, limiter=self.name)
+        self._semaphore.release()
+
+
+_limiters = {}
+
+
+def get_limiter(name: str) -> Limiter:
+    if name not in _limiters:
+        config = {**DEFAULTS.get(name, DEFAULTS["post_create"]), **ADMISSION_DATA.get(name, {})}
+        _limiters[name] = Limiter(name, config["concurrency"], config["queue"], config["timeout"])
+
+    return _limiters[name]
+
+
+def limit(name: str):
+    """ Dependencia de FastAPI que reserva un hueco del limitador durante la petición. """
+    limiter = get_limiter(name)
+
+    async def dependency():
+        started = await limiter.acquire()
+        try:
+            yield
+
+        finally:
+            limiter.release(started)
+
+    return dependency
@@ -0,0 +1,152 @@
+"""
+Servidor local que imita los endpoints de ficheros y lotes de la Batch API de OpenAI.
+Permite probar el modo por lotes de las noticias sin conexión:
+
+    uvicorn modules.batch_stub:app --port 3001
+
+y en data/config.json: "OPENAI": {"batch": {"enabled": true, "base_url": "http://localhost:3001/v1"}}
+"""
+import json
+import time
+import uuid
+
+from email.parser import BytesParser
+from email.policy import default
+
+from fastapi import FastAPI, Request, HTTPException
+from fastapi.responses import PlainTextResponse
+
+
+app = FastAPI(title="OpenAI Batch API stub")
+
+_files = {}     # ID -> {"meta": objeto file, "content": bytes}
+_batches = {}   # ID -> objeto batch
+
+
+def _file_object(file_id: str, filename: str, content: bytes, purpose: str) -> dict:
+    return {
+        "id": file_id,
+        "object": "file",
+        "bytes": len(content),
+        "created_at": int(time.time()),
+        "filename": filename,
+        "purpose": purpose,
+        "status": "processed",
+    }
+
+
+def _fake_response(custom_id: str, body: dict) -> dict:
+    # Respuesta determinista: resume la URL pedida con el formato que espera tool_gen_news
+    prompt = body["input"][-1]["content"][0]["text"]
+    summary = {
+        "sumary": {
+            "introduction": f"Entradilla de prueba para la petición {custom_id}.",
+            "content": f"Contenido de prueba generado sin conexión.\n\n{prompt}",
+        }
+    }
+
+    return {
+        "id": f"resp_{uuid.uuid4().hex}",
+        "object": "response",
+        "created_at": int(time.time()),
+        "model": body["model"],
+        "status": "completed",
+        "parallel_tool_calls": False,
+        "tool_choice": "auto",
+        "tools": [],
+        "output": [{
+            "id": f"msg_{uuid.uuid4().hex}",
+            "type": "message",
+            "role": "assistant",
+            "status": "completed",
+            "content": [{"type": "output_text", "text": json.dumps(summary, ensure_ascii=False), "annotations": []}],
+        }],
+        "usage": {
+            "input_tokens": len(prompt) // 4,
+            "input_tokens_details": {"cached_tokens": 0},
+            "output_tokens": 200,
+            "output_tokens_details": {"reasoning_tokens": 0},
+            "total_tokens": len(prompt) // 4 + 200,
+        },
+    }
+
+
+@app.post("/v1/files")
+async def upload_file(request: Request):
+    # Multipart analizado con la librería estándar para no depender de python-multipart
+    raw = await request.body()
+    header = f"Content-Type: {request.headers['content-type']}\r\n\r\n".encode()
+    message = BytesParser(policy=default).parsebytes(header + raw)
+
+    fields, filename, content = {}, "batch.jsonl", b""
+    for part in message.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        if part.get_filename():
+            filename, content = part.get_filename(), part.get_payload(decode=True)
+
+        else:
+            fields[name] = part.get_content().strip()
+
+    file_id = f"file-{uuid.uuid4().hex}"
+    meta = _file_object(file_id, filename, content, fields.get("purpose", "batch"))
+    _files[file_id] = {"meta": meta, "content": content}
+    return meta
+
+
+@app.get("/v1/files/{file_id}/content", response_class=PlainTextResponse)
+async def file_content(file_id: str):
+    if file_id not in _files:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    return _files[file_id]["content"].decode("utf-8")
+
+
+@app.post("/v1/batches")
+async def create_batch(request: Request):
+    payload = await request.json()
+    input_file = _files.get(payload["input_file_id"])
+    if input_file is None:
+        raise HTTPException(status_code=404, detail="Input file not found")
+
+    lines = []
+    for line in input_file["content"].decode("utf-8").splitlines():
+        if not line.strip():
+            continue
+
+        entry = json.loads(line)
+        lines.append(json.dumps({
+            "id": f"batch_req_{uuid.uuid4().hex}",
+            "custom_id": entry["custom_id"],
+            "response": {"status_code": 200, "request_id": uuid.uuid4().hex, "body": _fake_response(entry["custom_id"], entry["body"])},
+            "error": None,
+        }, ensure_ascii=False))
+
+    output = ("\n".join(lines) + "\n").encode("utf-8")
+    output_id = f"file-{uuid.uuid4().hex}"
+    _files[output_id] = {"meta": _file_object(output_id, "output.jsonl", output, "batch_output"), "content": output}
+
+    # El lote se completa al instante: la siguiente consulta ya devuelve los resultados
+    batch_id = f"batch_{uuid.uuid4().hex}"
+    now = int(time.time())
+    _batches[batch_id] = {
+        "id": batch_id,
+        "object": "batch",
+        "endpoint": payload["endpoint"],
+        "input_file_id": payload["input_file_id"],
+        "completion_window": payload["completion_window"],
+        "status": "completed",
+        "output_file_id": output_id,
+        "created_at": now,
+        "completed_at": now,
+        "request_counts": {"total": len(lines), "completed": len(lines), "failed": 0},
+    }
+
+    return _batches[batch_id]
+
+
+@app.get("/v1/batches/{batch_id}")
+async def retrieve_batch(batch_id: str):
+    if batch_id not in _batches:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    return _batches[batch_id]
@@ -13,6 +13,7 @@ class Tags(str, Enum):
     repos = "Repositories"
     post = "Post"
     news = "News"
+    builds = "Builds"
 
 
 class OrderField(str, Enum):
@@ -27,6 +28,11 @@ class OrderDirection(str, Enum):
     desc = "desc"
 
 
+class PostMode(str, Enum):
+    full = "full"   # Pipeline.POST: análisis, outline, redacción y pulido
+    fast = "fast"   # Pipeline.FAST_POST: una llamada estructurada y corrector local
+
+
 def load_config() -> dict:
     try:
         with open(CONFIG_FILE_PATH, 'r', encoding='utf-8') as f:
@@ -45,6 +51,7 @@ TAG_DESCRIPTIONS: Dict[str, str] = {
     Tags.repos.value:       "Repository CRUD.",
     Tags.post.value:        "Posts generated from repositories.",
     Tags.news.value:        "Search and publication of news.",
+    Tags.builds.value:      "Blog and news site rebuild triggers.",
 }
 
 
@@ -121,6 +128,26 @@ LOGGING_CONFIG = {
             "level": "INFO",
             "propagate": False,
         },
+        "monitor": {                    # Logger del vigilante del event loop
+            "handlers": ["console"],
+            "level": "INFO",
+            "propagate": False,
+        },
+        "admission": {                  # Logger del control de admisión
+            "handlers": ["console"],
+            "level": "INFO",
+            "propagate": False,
+        },
+        "gitea": {                      # Logger de las reconstrucciones en Gitea
+            "handlers": ["console"],
+            "level": "INFO",
+            "propagate": False,
+        },
+        "feeds": {                      # Logger de la ingesta de feeds RSS/Atom
+            "handlers": ["console"],
+            "level": "INFO",
+            "propagate": False,
+        },
         "": {                           # Logger raíz
             "handlers": ["console"],
             "level": "INFO",
@@ -141,6 +168,10 @@ log_main = logging.getLogger("main")          # Logger para el main principal
 log_database = logging.getLogger("database")  # Logger de la base de datos
 log_github = logging.getLogger("github")      # Logger de la API de GitHub
 log_techAI = logging.getLogger("techAI")      # Logger de la herramienta del LLM
+log_monitor = logging.getLogger("monitor")    # Logger del vigilante del event loop
+log_admission = logging.getLogger("admission")  # Logger del control de admisión
+log_gitea = logging.getLogger("gitea")        # Logger de las reconstrucciones en Gitea
+log_feeds = logging.getLogger("feeds")        # Logger de la ingesta de feeds RSS/Atom
 
 if settings.get('LOGGER'):
     log_config.info("Logging personalizado activado.")
@@ -1,10 +1,14 @@
+import json
 import time
 
+from datetime import datetime
+
+from modules import metrics
 from modules.config import log_database
 
 from sqlalchemy.orm import declarative_base, sessionmaker
-from sqlalchemy import Column, Integer, String, DateTime
-from sqlalchemy import create_engine, inspect, event, Engine
+from sqlalchemy import Column, Integer, Float, String, DateTime
+from sqlalchemy import create_engine, inspect, event, select, and_, or_, Engine
 
 
 Base = declarative_base()
@@ -35,6 +39,15 @@ class Posts(Base):
     updated_at = Column(DateTime, nullable=False)                # Fecha de última actualización del post
     article = Column(String, nullable=False)                     # Contenido del post
 
+class PostFingerprints(Base):
+    __tablename__ = 'post_fingerprints'
+    id = Column(Integer, primary_key=True, autoincrement=False)  # ID del repositorio y post
+    fingerprint = Column(String, nullable=True)                  # Huella de las entradas del último post generado
+    readme_url = Column(String, nullable=True)                   # URL desde la que se descargó el README
+    readme_etag = Column(String, nullable=True)                  # ETag del README para peticiones condicionales
+    readme_hash = Column(String, nullable=True)                  # Hash del último README observado
+    checked_at = Column(DateTime, nullable=True)                 # Fecha de la última comprobación
+
 class News(Base):
     __tablename__ = 'news'
     id = Column(Integer, primary_key=True, autoincrement=True)   # ID de la noticia
@@ -45,6 +58,17 @@ class News(Base):
     published_at = Column(DateTime, nullable=False)              # Fecha de publicación
     url = Column(String, nullable=False, unique=True)            # URL de la noticia
 
+class NewsBatches(Base):
+    __tablename__ = 'news_batches'
+    id = Column(String, primary_key=True)                        # ID del lote en la Batch API
+    status = Column(String, nullable=False)                      # Estado del lote
+    items = Column(String, nullable=False)                       # Noticias enviadas (JSON)
+    input_file = Column(String, nullable=False)                  # Fichero JSONL de peticiones
+    created_at = Column(DateTime, nullable=False)                # Fecha de envío
+    finished_at = Column(DateTime, nullable=True)                # Fecha de recogida de resultados
+    failed = Column(Integer, nullable=False, default=0)          # Peticiones fallidas dentro del lote
+    errors = Column(String, nullable=True)                       # Detalle de las fallidas (JSON: url, error)
+
 class NewsSource(Base):
     __tablename__ = 'news_source'
     id = Column(Integer, primary_key=True, autoincrement=True)   # ID de la fuente
@@ -54,6 +78,96 @@ class NewsSource(Base):
     added_at = Column(DateTime, nullable=False)                  # Fecha de adición de la fuente
     score = Column(Integer, nullable=False, default=0)           # Puntuación de la fuente
 
+class FeedState(Base):
+    __tablename__ = 'feed_state'
+    id = Column(Integer, primary_key=True, autoincrement=False)  # ID de la fuente de noticias
+    etag = Column(String, nullable=True)                         # ETag de la última respuesta
+    last_modified = Column(String, nullable=True)                # Last-Modified de la última respuesta
+    last_guid = Column(String, nullable=True)                    # GUID del ítem más reciente
+    last_bytes = Column(Integer, nullable=False, default=0)      # Tamaño de la última descarga completa
+    last_elapsed = Column(Float, nullable=False, default=0.0)    # Segundos de la última descarga completa
+    response_time = Column(Float, nullable=True)                 # Segundos de respuesta al validar la fuente
+    fetched_at = Column(DateTime, nullable=True)                 # Fecha de la última descarga
+
+class FeedWatermark(Base):
+    __tablename__ = 'feed_watermark'
+    id = Column(Integer, primary_key=True, autoincrement=False)  # ID de la fuente de noticias
+    published_at = Column(DateTime, nullable=True)               # Fecha del ítem más reciente ya procesado
+    guids = Column(String, nullable=True)                        # GUIDs procesados con esa fecha, uno por línea
+    pending_published_at = Column(DateTime, nullable=True)       # Marca de la ejecución en curso
+    pending_guids = Column(String, nullable=True)                # GUIDs de la marca pendiente
+    staged_at = Column(DateTime, nullable=True)                  # Lectura de la ejecución en curso sin confirmar
+    updated_at = Column(DateTime, nullable=True)                 # Fecha en que se confirmó la marca
+
+class SourceSchedule(Base):
+    __tablename__ = 'source_schedule'
+    id = Column(Integer, primary_key=True, autoincrement=False)  # ID de la fuente de noticias
+    interval_days = Column(Float, nullable=False)                # Días entre lecturas
+    next_poll_at = Column(DateTime, nullable=True)               # Próxima lectura programada
+    polled_at = Column(DateTime, nullable=True)                  # Última lectura
+    scored_at = Column(DateTime, nullable=True)                  # Última puntuación
+    failures = Column(Integer, nullable=False, default=0)        # Fallos seguidos
+    dormant = Column(Integer, nullable=False, default=0)         # Lecturas seguidas sin noticias aceptadas
+    fetched = Column(Integer, nullable=False, default=0)         # Ítems en la ventana en la última lectura
+    failed = Column(Integer, nullable=False, default=0)          # Si la última lectura falló (0/1)
+    latency = Column(Float, nullable=False, default=0.0)         # Segundos de la última lectura
+    retired_at = Column(DateTime, nullable=True)                 # Fecha de retirada automática
+
+class Rebuilds(Base):
+    __tablename__ = 'rebuilds'
+    id = Column(Integer, primary_key=True, autoincrement=True)   # ID de la reconstrucción
+    target = Column(String, nullable=False)                      # Sitio reconstruido (blog, news)
+    reasons = Column(String, nullable=False)                     # Origen de los avisos agrupados
+    triggers = Column(Integer, nullable=False, default=1)        # Número de avisos agrupados
+    requested_at = Column(DateTime, nullable=False)              # Fecha del primer aviso
+    finished_at = Column(DateTime, nullable=False)               # Fecha de fin del último intento
+    attempts = Column(Integer, nullable=False, default=0)        # Intentos realizados
+    status = Column(String, nullable=False)                      # Resultado (success, failed)
+    status_code = Column(Integer, nullable=True)                 # Último código HTTP recibido
+
+class LLMCalls(Base):
+    __tablename__ = 'llm_calls'
+    id = Column(Integer, primary_key=True, autoincrement=True)   # ID de la llamada
+    pipeline = Column(String, nullable=False)                    # Pipeline que la originó (POST, NEWS...)
+    step = Column(String, nullable=False)                        # Paso del pipeline
+    model = Column(String, nullable=False)                       # Modelo usado
+    operation = Column(String, nullable=False)                   # Endpoint de OpenAI (chat.completions, responses)
+    input_tokens = Column(Integer, nullable=False, default=0)    # Tokens de entrada
+    output_tokens = Column(Integer, nullable=False, default=0)   # Tokens de salida
+    reasoning_tokens = Column(Integer, nullable=False, default=0)  # Tokens de razonamiento (incluidos en la salida)
+    latency = Column(Float, nullable=False)                      # Segundos de la llamada, reintentos incluidos
+    retries = Column(Integer, nullable=False, default=0)         # Reintentos realizados
+    status = Column(String, nullable=False)                      # Resultado (success, failed)
+    created_at = Column(DateTime, nullable=False)                # Fecha de la llamada
+
+class PipelineRuns(Base):
+    __tablename__ = 'pipeline_runs'
+    id = Column(String, primary_key=True)                        # ID de la ejecución
+    pipeline = Column(String, nullable=False)                    # Pipeline ejecutado (POST, NEWS...)
+    input_hash = Column(String, nullable=False)                  # Hash de la entrada del pipeline
+    status = Column(String, nullable=False)                      # Estado (running, failed, done, expired)
+    started_at = Column(DateTime, nullable=False)                # Fecha de inicio
+    attempt_at = Column(DateTime, nullable=False)                # Fecha de inicio del último intento
+    finished_at = Column(DateTime, nullable=True)                # Fecha de fin del último intento
+
+class StepCheckpoints(Base):
+    __tablename__ = 'step_checkpoints'
+    run_id = Column(String, primary_key=True)                    # ID de la ejecución
+    step = Column(String, primary_key=True)                      # Paso completado (o paso[índice])
+    output = Column(String, nullable=False)                      # Salida del paso (JSON)
+    created_at = Column(DateTime, nullable=False)                # Fecha del checkpoint
+
+class LLMCache(Base):
+    __tablename__ = 'llm_cache'
+    key = Column(String, primary_key=True)                       # Hash de (modelo, parámetros, mensajes)
+    step = Column(String, nullable=False)                        # Paso del pipeline que la generó
+    model = Column(String, nullable=False)                       # Modelo usado
+    response = Column(String, nullable=False)                    # Respuesta serializada
+    tokens = Column(Integer, nullable=False, default=0)          # Tokens consumidos al generarla
+    hits = Column(Integer, nullable=False, default=0)            # Veces reutilizada
+    created_at = Column(DateTime, nullable=False)                # Fecha de creación
+    last_hit_at = Column(DateTime, nullable=False)               # Fecha del último uso
+
 # Configuración de la base de datos SQLite
 DATABASE_URL = "sqlite:///data/repositories.db"
 engine = create_engine(DATABASE_URL, echo=False)
@@ -69,9 +183,19 @@ def before_cursor_execute(conn, cursor, statement, parameters, context, executem
 @event.listens_for(Engine, "after_cursor_execute")
 def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
     total = time.time() - conn.info['query_start_time'].pop()
+    metrics.DB_QUERY_LATENCY.observe(total)
     log_database.debug(f"Consulta completada en {total:.3f}s.")
 
 
+# Exporta el estado del pool de conexiones en cada lectura de /metrics
+@metrics.collector
+def pool_stats():
+    pool = engine.pool
+    for state in ("size", "checkedin", "checkedout", "overflow"):
+        if hasattr(pool, state):
+            metrics.DB_POOL.set(getattr(pool, state)(), state=state)
+
+
 def check_table_structure(model, inspector, logger):
     """
     Compara la estructura de un modelo SQLAlchemy con la tabla real en la BD.
@@ -125,6 +249,24 @@ def init_db():
 init_db()
 
 
+def iter_rows(model, order_clause=None, batch: int = 200):
+    """
+    Recorre una tabla por lotes con `yield_per` y devuelve cada fila como diccionario.
+    Se leen columnas, no objetos ORM, así que la memoria no crece con el tamaño de la tabla.
+    """
+    query = select(model.__table__)
+    if order_clause is not None:
+        query = query.order_by(order_clause)
+
+    with SessionLocal() as session:
+        count = 0
+        for row in session.execute(query.execution_options(yield_per=batch)):
+            count += 1
+            yield dict(row._mapping)
+
+        log_database.info(f"{count} filas de '{model.__tablename__}' enviadas en streaming.")
+
+
 """ REPOSITORIOS """
 def set_repo(new_repo: Repos):
     with SessionLocal() as session:
@@ -147,6 +289,10 @@ def get_repos(order_by: str = "id", desc: bool = True):
             log_database.warning("No se encontraron repositorios.")
             return []
 
+def iter_repos(order_by: str = "id", desc: bool = True):
+    column = getattr(Repos, order_by)
+    return iter_rows(Repos, column.desc() if desc else column.asc())
+
 def get_repo(by_id: int):
     with SessionLocal() as session:
         repo = session.query(Repos).filter(Repos.id == by_id).first()
@@ -227,6 +373,16 @@ def update_post(post):
         else:
             log_database.warning(f"Post con ID {post.id} no encontrado para actualizar.")
 
+def get_post_fingerprint(repo_id: int):
+    with SessionLocal() as session:
+        return session.query(PostFingerprints).filter(PostFingerprints.id == repo_id).first()
+
+def save_post_fingerprint(fingerprint: PostFingerprints):
+    with SessionLocal() as session:
+        session.merge(fingerprint)
+        session.commit()
+        log_database.debug(f"Huella del post {fingerprint.id} guardada exitosamente.")
+
 def get_posts(order_by: str = "id", desc: bool = True):
     with SessionLocal() as session:
         column = getattr(Posts, order_by)
@@ -242,6 +398,10 @@ def get_posts(order_by: str = "id", desc: bool = True):
             log_database.warning("No se encontraron posts.")
             return []
 
+def iter_posts(order_by: str = "id", desc: bool = True):
+    column = getattr(Posts, order_by)
+    return iter_rows(Posts, column.desc() if desc else column.asc())
+
 
 """ NOTICIAS """
 def save_news(new_news: News):
@@ -261,6 +421,9 @@ def get_news():
             log_database.warning("No se encontraron noticias.")
             return []
 
+def iter_news():
+    return iter_rows(News, News.id.asc())
+
 def get_news_by_url(url: str):
     with SessionLocal() as session:
         news = session.query(News).filter(News.url == url).first()
@@ -273,6 +436,38 @@ def get_news_by_url(url: str):
             return None
 
 
+def get_recent_news(since: datetime) -> list[dict]:
+    with SessionLocal() as session:
+        query = select(News.title, News.url).where(News.published_at >= since)
+        return [{"title": row.title, "url": row.url} for row in session.execute(query)]
+
+
+""" LOTES DE NOTICIAS """
+def save_news_batch(new_batch: NewsBatches):
+    with SessionLocal() as session:
+        session.add(new_batch)
+        session.commit()
+        log_database.info(f"Lote de noticias [{new_batch.id}] guardado exitosamente.")
+
+def get_pending_news_batches():
+    with SessionLocal() as session:
+        return session.query(NewsBatches).filter(NewsBatches.finished_at.is_(None)).all()
+
+def finish_news_batch(batch_id: str, status: str, errors: list = ()):
+    with SessionLocal() as session:
+        batch = session.query(NewsBatches).filter(NewsBatches.id == batch_id).first()
+        if batch:
+            batch.status = status
+            batch.finished_at = datetime.now()
+            batch.failed = len(errors)
+            batch.errors = json.dumps(list(errors), ensure_ascii=False) if errors else None
+            session.commit()
+            log_database.info(f"Lote de noticias [{batch_id}] cerrado con estado {status}.")
+
+        else:
+            log_database.warning(f"Lote de noticias [{batch_id}] no encontrado para cerrar.")
+
+
 """ FUENTES DE NOTICIAS """
 def save_news_source(new_source: NewsSource):
     with SessionLocal() as session:
@@ -280,6 +475,28 @@ def save_news_source(new_source: NewsSource):
         session.commit()
         log_database.info(f"Fuente de noticias guardada exitosamente.")
 
+def save_news_sources(new_sources: list[NewsSource]) -> dict:
+    """ Inserta varias fuentes en una sola transacción, omitiendo las ya almacenadas. Devuelve {nombre: id}. """
+    with SessionLocal() as session:
+        stored = session.query(NewsSource.name, NewsSource.url, NewsSource.rss).all()
+        seen = {value for row in stored for value in row}
+
+        fresh = []
+        for source in new_sources:
+            if {source.name, source.url, source.rss} & seen:
+                log_database.warning(f"Fuente ya almacenada: {source.name}")
+                continue
+
+            seen.update((source.name, source.url, source.rss))
+            fresh.append(source)
+
+        session.add_all(fresh)
+        session.commit()
+
+        saved = {source.name: source.id for source in fresh}
+        log_database.info(f"{len(saved)} fuentes de noticias guardadas exitosamente.")
+        return saved
+
 def get_news_sources():
     with SessionLocal() as session:
         sources = session.query(NewsSource).all()
@@ -301,3 +518,251 @@ def get_source_id_by_name(name: str):
         else:
             log_database.warning(f"Fuente de noticias con URL [{name}] no encontrada.")
             return None
+
+
+""" PROGRAMACIÓN DE FUENTES """
+def get_source_schedules() -> dict:
+    with SessionLocal() as session:
+        return {schedule.id: schedule for schedule in session.query(SourceSchedule).all()}
+
+def save_source_schedules(schedules: list[SourceSchedule]):
+    with SessionLocal() as session:
+        for schedule in schedules:
+            session.merge(schedule)
+
+        session.commit()
+        log_database.debug(f"Programación de {len(schedules)} fuentes guardada exitosamente.")
+
+def update_source_scores(scores: dict):
+    with SessionLocal() as session:
+        for source in session.query(NewsSource).filter(NewsSource.id.in_(scores)).all():
+            source.score = scores[source.id]
+
+        session.commit()
+
+
+""" ESTADO DE LOS FEEDS """
+def get_feed_states():
+    with SessionLocal() as session:
+        return {state.id: state for state in session.query(FeedState).all()}
+
+def save_feed_states(states: list[FeedState]):
+    with SessionLocal() as session:
+        for state in states:
+            session.merge(state)
+
+        session.commit()
+        log_database.debug(f"Estado de {len(states)} feeds guardado exitosamente.")
+
+
+""" MARCAS DE AGUA DE LOS FEEDS """
+def get_feed_watermarks() -> dict:
+    with SessionLocal() as session:
+        return {mark.id: mark for mark in session.query(FeedWatermark).all()}
+
+def stage_feed_watermarks(marks: dict):
+    """
+    Sustituye las lecturas pendientes por las de la ejecución actual: {id: (fecha, guids)},
+    o {id: None} si la fuente se leyó sin ítems nuevos.
+    """
+    with SessionLocal() as session:
+        session.query(FeedWatermark).update(
+            {"pending_published_at": None, "pending_guids": None, "staged_at": None}
+        )
+
+        now = datetime.now()
+        for source_id, pending in marks.items():
+            mark = session.get(FeedWatermark, source_id) or FeedWatermark(id=source_id)
+            if pending is not None:
+                mark.pending_published_at, mark.pending_guids = pending[0], "\n".join(pending[1])
+
+            mark.staged_at = now
+            session.add(mark)
+
+        session.commit()
+        log_database.debug(f"{len(marks)} marcas de agua pendientes guardadas.")
+
+def commit_feed_watermarks() -> int:
+    """ Confirma las marcas pendientes tras una ejecución completa. Devuelve cuántas se han confirmado. """
+    with SessionLocal() as session:
+        marks = session.query(FeedWatermark).filter(FeedWatermark.staged_at.isnot(None)).all()
+        for mark in marks:
+            if mark.pending_published_at is not None:
+                mark.published_at, mark.guids = mark.pending_published_at, mark.pending_guids
+
+            mark.pending_published_at = mark.pending_guids = mark.staged_at = None
+            mark.updated_at = datetime.now()
+
+        session.commit()
+        return len(marks)
+
+
+""" RECONSTRUCCIONES """
+def save_rebuild(new_rebuild: Rebuilds):
+    with SessionLocal() as session:
+        session.add(new_rebuild)
+        session.commit()
+        log_database.info(f"Reconstrucción de [{new_rebuild.target}] registrada exitosamente.")
+
+def get_rebuilds(limit: int = 50):
+    with SessionLocal() as session:
+        rebuilds = session.query(Rebuilds).order_by(Rebuilds.id.desc()).limit(limit).all()
+        if rebuilds:
+            log_database.info(f"{len(rebuilds)} reconstrucciones recuperadas exitosamente.")
+            return rebuilds
+
+        else:
+            log_database.warning("No se encontraron reconstrucciones.")
+            return []
+
+
+""" LLAMADAS AL LLM """
+def save_llm_call(new_call: LLMCalls):
+    with SessionLocal() as session:
+        session.add(new_call)
+        session.commit()
+
+def get_llm_calls(since: datetime):
+    with SessionLocal() as session:
+        query = (
+            select(LLMCalls.pipeline, LLMCalls.step, LLMCalls.created_at, LLMCalls.latency, LLMCalls.retries, LLMCalls.status,
+                   LLMCalls.input_tokens, LLMCalls.output_tokens, LLMCalls.reasoning_tokens)
+            .where(LLMCalls.created_at >= since)
+            .order_by(LLMCalls.created_at)
+        )
+        return session.execute(query).all()
+
+
+""" EJECUCIONES DE PIPELINES """
+def save_pipeline_run(new_run: PipelineRuns):
+    with SessionLocal() as session:
+        session.add(new_run)
+        session.commit()
+
+def claim_pipeline_run(pipeline: str, input_hash: str, since: datetime, stale_before: datetime):
+    """
+    Reclama para este intento la última ejecución reanudable: fallida, o en curso pero sin
+    actividad desde `stale_before` (proceso caído). Una ejecución en curso activa no se comparte.
+    Devuelve el ID reclamado o None.
+    """
+    resumable = or_(
+        PipelineRuns.status == "failed",
+        and_(PipelineRuns.status == "running", PipelineRuns.attempt_at < stale_before)
+    )
+
+    with SessionLocal() as session:
+        candidates = (
+            session.query(PipelineRuns.id)
+            .filter(PipelineRuns.pipeline == pipeline,
+                    PipelineRuns.input_hash == input_hash,
+                    PipelineRuns.started_at >= since,
+                    resumable)
+            .order_by(PipelineRuns.started_at.desc())
+            .all()
+        )
+
+        for (run_id,) in candidates:
+            # UPDATE condicional: si otro intento la reclamó antes, no se modifica ninguna fila
+            claimed = (
+                session.query(PipelineRuns)
+                .filter(PipelineRuns.id == run_id, resumable)
+                .update({"status": "running", "attempt_at": datetime.now(), "finished_at": None},
+                        synchronize_session=False)
+            )
+            session.commit()
+            if claimed:
+                return run_id
+
+        return None
+
+def get_pipeline_runs(since: datetime, status: str = "done"):
+    with SessionLocal() as session:
+        query = (
+            select(PipelineRuns.pipeline, PipelineRuns.started_at, PipelineRuns.finished_at)
+            .where(PipelineRuns.status == status, PipelineRuns.started_at >= since)
+        )
+        return session.execute(query).all()
+
+def expire_pipeline_runs(pipeline: str, before: datetime) -> int:
+    """ Marca como `expired` las ejecuciones no completadas anteriores a `before` y borra sus checkpoints. """
+    with SessionLocal() as session:
+        runs = (
+            session.query(PipelineRuns)
+            .filter(PipelineRuns.pipeline == pipeline,
+                    PipelineRuns.status.in_(("failed", "running")),
+                    PipelineRuns.started_at < before)
+            .all()
+        )
+        for run in runs:
+            run.status = "expired"
+            session.query(StepCheckpoints).filter(StepCheckpoints.run_id == run.id).delete()
+
+        session.commit()
+        return len(runs)
+
+def finish_pipeline_run(run_id: str, status: str):
+    with SessionLocal() as session:
+        run = session.query(PipelineRuns).filter(PipelineRuns.id == run_id).first()
+        if run is None:
+            log_database.warning(f"Ejecución [{run_id}] no encontrada para cerrar.")
+            return
+
+        run.status = status
+        run.finished_at = datetime.now()
+
+        # Una ejecución completada ya no se reanuda: sus checkpoints sobran
+        if status == "done":
+            session.query(StepCheckpoints).filter(StepCheckpoints.run_id == run_id).delete()
+
+        session.commit()
+        log_database.debug(f"Ejecución [{run_id}] cerrada con estado {status}.")
+
+def save_step_checkpoint(checkpoint: StepCheckpoints):
+    with SessionLocal() as session:
+        session.merge(checkpoint)
+        session.commit()
+        log_database.debug(f"Checkpoint [{checkpoint.step}] de la ejecución [{checkpoint.run_id}] guardado.")
+
+def get_step_checkpoints(run_id: str) -> dict:
+    with SessionLocal() as session:
+        rows = session.query(StepCheckpoints).filter(StepCheckpoints.run_id == run_id).all()
+        return {row.step: json.loads(row.output) for row in rows}
+
+
+""" CACHÉ DEL LLM """
+def get_llm_cache(key: str, since: datetime):
+    """ Devuelve la entrada si se creó después de `since`; solo entonces cuenta como acierto. """
+    with SessionLocal() as session:
+        entry = session.query(LLMCache).filter(LLMCache.key == key, LLMCache.created_at > since).first()
+        if entry:
+            entry.hits += 1
+            entry.last_hit_at = datetime.now()
+            session.commit()
+            session.refresh(entry)
+            log_database.debug(f"Entrada de caché [{key[:12]}] recuperada exitosamente.")
+            return entry
+
+        return None
+
+def save_llm_cache(new_entry: LLMCache):
+    with SessionLocal() as session:
+        session.merge(new_entry)
+        session.commit()
+        log_database.debug(f"Entrada de caché [{new_entry.key[:12]}] guardada exitosamente.")
+
+def evict_llm_cache(expired_before: datetime, max_entries: int) -> int:
+    with SessionLocal() as session:
+        removed = session.query(LLMCache).filter(LLMCache.created_at < expired_before).delete()
+
+        # Si sigue por encima del límite se descartan las menos usadas recientemente
+        overflow = session.query(LLMCache).count() - max_entries
+        if overflow > 0:
+            oldest = session.query(LLMCache.key).order_by(LLMCache.last_hit_at.asc()).limit(overflow)
+            removed += session.query(LLMCache).filter(LLMCache.key.in_(oldest.scalar_subquery())).delete(
+                synchronize_session=False)
+
+        session.commit()
+        if removed:
+            log_database.info(f"{removed} entradas de caché del LLM eliminadas.")
+
+        return removed
@@ -0,0 +1,120 @@
+import re
+import random
+import hashlib
+import unicodedata
+
+from urllib.parse import urlparse
+
+from modules.config import log_techAI, settings
+
+
+NEWS_DATA = settings.get('NEWS', {})
+THRESHOLD = NEWS_DATA.get('dedup_threshold', 0.5)    # Similitud Jaccard estimada para considerar duplicado
+NUM_PERM  = 64                                       # Funciones hash de la firma MinHash
+BANDS     = 32                                       # Bandas LSH de 2 filas: alta sensibilidad, se verifica después
+
+PRIME = (1 << 61) - 1
+_rng = random.Random(42)    # Semilla fija: las firmas son estables entre ejecuciones
+PERMUTATIONS = [(_rng.randrange(1, PRIME), _rng.randrange(0, PRIME)) for _ in range(NUM_PERM)]
+
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "for", "to", "in", "on", "with", "is", "are", "now", "new",
+    "el", "la", "los", "las", "un", "una", "y", "o", "de", "del", "para", "en", "con", "por", "que", "se", "ya",
+    "www", "com", "org", "net", "io", "dev", "blog", "news", "html", "htm", "php", "index",
+}
+
+
+def _tokens(text: str) -> list[str]:
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    # Versiones equivalentes: 3.14.0 → 3.14
+    text = re.sub(r"\b(\d+\.\d+)(?:\.0)+\b", r"\1", text)
+    return [token for token in re.findall(r"[a-z0-9]+(?:\.[0-9]+)*", text) if token not in STOPWORDS]
+
+
+def shingles(title: str, url: str) -> set[str]:
+    """ Unigramas y bigramas del título normalizado más las palabras del slug de la URL. """
+    words = _tokens(title)
+    parsed = urlparse(url)
+    # En la ruta, los números sueltos suelen ser fechas o IDs y no aportan
+    slug = [token for token in _tokens(parsed.path.replace("-", " ").replace("_", " ").replace("/", " "))
+            if not token.isdigit()]
+
+    result = set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])} | {f"url:{token}" for token in slug}
+    return result or {url}
+
+
+def signature(items: set[str]) -> list[int]:
+    hashes = [int.from_bytes(hashlib.blake2b(item.encode("utf-8"), digest_size=8).digest(), "big") for item in items]
+    return [min((a * value + b) % PRIME for value in hashes) for a, b in PERMUTATIONS]
+
+
+def similarity(first: list[int], second: list[int]) -> float:
+    return sum(a == b for a, b in zip(first, second)) / NUM_PERM
+
+
+def _candidates(signatures: list[list[int]]) -> set[tuple[int, int]]:
+    # LSH por bandas: solo se comparan las parejas que coinciden en alguna banda completa
+    rows = NUM_PERM // BANDS
+    pairs = set()
+    for band in range(BANDS):
+        buckets = {}
+        for index, sig in enumerate(signatures):
+            buckets.setdefault(tuple(sig[band * rows:(band + 1) * rows]), []).append(index)
+
+        for members in buckets.values():
+            pairs.update((a, b) for i, a in enumerate(members) for b in members[i + 1:])
+
+    return pairs
+
+
+def cluster(news: list[dict], known: list[dict] = ()) -> list[list[int]]:
+    """
+    Agrupa en clusters las noticias casi duplicadas de `news` entre sí y con `known`
+    (noticias ya publicadas). Devuelve los índices de `news` de cada cluster; un índice
+    negativo -(k + 1) identifica a la noticia `known[k]`.
+    """
+    items = list(news) + list(known)
+    signatures = [signature(shingles(item["title"], item["url"])) for item in items]
+
+    parent = list(range(len(items)))
+
+    def find(index):
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    for a, b in _candidates(signatures):
+        if similarity(signatures[a], signatures[b]) >= THRESHOLD:
+            parent[find(a)] = find(b)
+
+    groups = {}
+    for index in range(len(items)):
+        groups.setdefault(find(index), []).append(index if index < len(news) else -(index - len(news) + 1))
+
+    return [sorted(group) for group in groups.values()]
+
+
+def representatives(news: list[dict], known: list[dict] = ()) -> list[dict]:
+    """
+    Deja una noticia por cluster: la de fecha más antigua (el anuncio original).
+    Los clusters que contienen una noticia ya publicada se descartan enteros.
+    """
+    selected = []
+    for group in cluster(news, known):
+        if any(index < 0 for index in group):
+            for index in group:
+                if index >= 0:
+                    log_techAI.info(f"Noticia ya publicada con otra fuente: {news[index]['url']}")
+            continue
+
+        members = sorted((news[index] for index in group), key=lambda item: (item["date"], len(item["url"])))
+        for duplicate in members[1:]:
+            log_techAI.info(f"Noticia duplicada de {members[0]['url']}: {duplicate['url']}")
+
+        selected.append(members[0])
+
+    # Se conserva el orden original de la lista de entrada
+    order = {id(item): index for index, item in enumerate(news)}
+    return sorted(selected, key=lambda item: order[id(item)])
@@ -0,0 +1,432 @@
+import re
+import html
+import time
+import asyncio
+import xml.etree.ElementTree as ET
+
+from datetime import datetime
+from urllib.parse import urlparse, urlunparse
+from collections import defaultdict
+from email.utils import parsedate_to_datetime
+from dateutil.parser import isoparse
+
+from modules import database, http_client, metrics
+from modules.config import log_feeds, settings
+
+
+FEEDS_DATA  = settings.get('NEWS', {})
+CONCURRENCY = FEEDS_DATA.get('feed_concurrency', 8)      # Feeds descargados a la vez
+FEED_TIMEOUT = FEEDS_DATA.get('feed_timeout', 20)        # Segundos máximos por feed
+MAX_BYTES   = FEEDS_DATA.get('feed_max_bytes', 5_000_000)  # Tamaño máximo de un feed
+PER_HOST    = FEEDS_DATA.get('feed_per_host', 2)         # Peticiones simultáneas al mismo dominio
+PROBE_BYTES = FEEDS_DATA.get('probe_bytes', 4096)        # Bytes leídos para validar un feed
+SHARED_HOSTS = set(FEEDS_DATA.get('shared_hosts', ["github.com", "gitlab.com", "feeds.feedburner.com"]))
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+RSS1 = "{http://purl.org/rss/1.0/}"
+RDF  = "{http://www.w3.org/1999/02/22-rdf-syntax-ns#}"
+DC   = "{http://purl.org/dc/elements/1.1/}"
+
+ITEM_TAGS = {"item", RSS1 + "item", ATOM + "entry"}
+ROOT_TAGS = {"rss", ATOM + "feed", RDF + "RDF"}
+
+
+class FeedError(Exception):
+    pass
+
+
+# ---------- NORMALIZACIÓN ----------
+def _clean(text: str | None) -> str:
+    if not text:
+        return ""
+
+    text = re.sub(r"<[^>]+>", " ", html.unescape(text))
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _parse_date(text: str | None) -> datetime | None:
+    if not text:
+        return None
+
+    text = text.strip()
+    for parse in (parsedate_to_datetime, isoparse):
+        try:
+            date = parse(text)
+
+        except (TypeError, ValueError, IndexError, OverflowError):
+            continue
+
+        # Se trabaja en hora local sin zona, igual que el resto de la aplicación
+        return date.astimezone().replace(tzinfo=None) if date.tzinfo else date
+
+    return None
+
+
+def _atom_link(entry) -> str:
+    for link in entry.findall(ATOM + "link"):
+        if link.get("rel", "alternate") == "alternate" and link.get("href"):
+            return link.get("href")
+
+    link = entry.find(ATOM + "link")
+    return link.get("href", "") if link is not None else ""
+
+
+def parse_item(elem) -> dict | None:
+    """ Normaliza un <item> RSS 2.0/1.0 o un <entry> Atom a título, url, fecha y guid. """
+    if elem.tag == ATOM + "entry":
+        title = elem.findtext(ATOM + "title")
+        url = _atom_link(elem)
+        date = elem.findtext(ATOM + "published") or elem.findtext(ATOM + "updated")
+        guid = elem.findtext(ATOM + "id")
+
+    else:
+        ns = RSS1 if elem.tag == RSS1 + "item" else ""
+        title = elem.findtext(ns + "title")
+        url = elem.findtext(ns + "link") or elem.get(RDF + "about", "")
+        date = elem.findtext("pubDate") or elem.findtext(DC + "date")
+        guid = elem.findtext("guid")
+
+    title, url = _clean(title), (url or "").strip()
+    published = _parse_date(date)
+    if not title or not url or published is None:
+        return None
+
+    return {"title": title, "url": url, "published_at": published, "guid": (guid or url).strip()}
+
+
+# ---------- DESCARGA ----------
+async def _stream_items(response, stop_guid: str | None = None) -> tuple[list, int, str | None]:
+    """
+    Parser incremental: cada ítem se procesa y se libera en cuanto se cierra su etiqueta.
+    Si el primer ítem del documento tiene `stop_guid` el feed no ha cambiado y se deja de leer.
+    Devuelve (ítems, bytes leídos, GUID del primer ítem).
+    """
+    parser = ET.XMLPullParser(events=("end",))
+    items, size, newest = [], 0, None
+
+    async for chunk in response.aiter_bytes():
+        size += len(chunk)
+        if size > MAX_BYTES:
+            raise FeedError(f"Feed mayor de {MAX_BYTES} bytes")
+
+        parser.feed(chunk)
+        for _, elem in parser.read_events():
+            if elem.tag in ITEM_TAGS:
+                item = parse_item(elem)
+                if item is not None:
+                    if newest is None:
+                        newest = item["guid"]
+                        if newest == stop_guid:
+                            return [], size, newest
+
+                    items.append(item)
+
+                elem.clear()
+
+    parser.close()
+    return items, size, newest
+
+
+def _conditional_headers(state) -> dict:
+    headers = {}
+    if state is not None and state.etag:
+        headers["If-None-Match"] = state.etag
+
+    if state is not None and state.last_modified:
+        headers["If-Modified-Since"] = state.last_modified
+
+    return headers
+
+
+async def fetch_feed(source, state: database.FeedState | None = None) -> dict:
+    """
+    Descarga y analiza el feed de una fuente con petición condicional según su estado guardado.
+    Devuelve {"source", "status", "items", "bytes", "elapsed", "etag", "last_modified", "guid", "error"},
+    con `status` en fetched, not_modified (304), unchanged (mismo GUID más reciente) o error.
+    """
+    client = http_client.get_client()
+    result = {
+        "source": source, "status": "fetched", "items": [], "bytes": 0, "elapsed": 0.0,
+        "etag": None, "last_modified": None, "guid": None, "error": None
+    }
+    start = time.perf_counter()
+
+    try:
+        with metrics.upstream("feeds", "fetch"):
+            async with client.stream(
+                "GET", source.rss, headers=_conditional_headers(state), timeout=FEED_TIMEOUT
+            ) as response:
+                result["etag"] = response.headers.get("etag")
+                result["last_modified"] = response.headers.get("last-modified")
+
+                if response.status_code == 304:
+                    result["status"] = "not_modified"
+
+                elif response.status_code != 200:
+                    raise FeedError(f"HTTP {response.status_code}")
+
+                else:
+                    stop_guid = state.last_guid if state is not None else None
+                    result["items"], result["bytes"], result["guid"] = await _stream_items(response, stop_guid)
+                    if stop_guid is not None and result["guid"] == stop_guid:
+                        result["status"] = "unchanged"
+
+    except Exception as e:
+        # Un feed roto (HTTP, XML mal formado, timeout...) no debe frenar al resto
+        result["status"] = "error"
+        result["error"] = str(e) or type(e).__name__
+        log_feeds.warning(f"[{source.name}] Feed no procesable: {result['error']}")
+
+    result["elapsed"] = time.perf_counter() - start
+    metrics.FEED_FETCHES.inc(result=result["status"])
+    return result
+
+
+def _next_state(result: dict, state: database.FeedState | None) -> database.FeedState:
+    # Un feed sin cambios conserva las cifras de su última descarga completa como referencia
+    fetched = result["status"] == "fetched" or state is None
+    previous = state if state is not None else database.FeedState()
+
+    return database.FeedState(
+        id=result["source"].id,
+        etag=result["etag"] or previous.etag,
+        last_modified=result["last_modified"] or previous.last_modified,
+        last_guid=result["guid"] or previous.last_guid,
+        last_bytes=result["bytes"] if fetched else previous.last_bytes,
+        last_elapsed=result["elapsed"] if fetched else previous.last_elapsed,
+        response_time=previous.response_time,
+        fetched_at=datetime.now()
+    )
+
+
+def _is_new(item: dict, mark: database.FeedWatermark | None, since: datetime) -> bool:
+    # Sin marca se usa la ventana por defecto; con marca, solo lo posterior a ella
+    if mark is None or mark.published_at is None:
+        return item["published_at"] >= since
+
+    if item["published_at"] == mark.published_at:
+        return item["guid"] not in (mark.guids or "").split("\n")
+
+    return item["published_at"] > mark.published_at
+
+
+def _watermark(items: list[dict], mark: database.FeedWatermark | None) -> tuple[datetime, list[str]]:
+    newest = max(item["published_at"] for item in items)
+    guids = [item["guid"] for item in items if item["published_at"] == newest]
+
+    # Ítems nuevos con la misma fecha que la marca: se conservan también los ya procesados
+    if mark is not None and mark.published_at == newest and mark.guids:
+        guids = mark.guids.split("\n") + guids
+
+    return newest, guids
+
+
+async def ingest(sources: list, since: datetime, until: datetime) -> list[dict]:
+    """
+    Descarga los feeds en paralelo y se queda con los ítems posteriores a la marca de agua
+    de cada fuente (o desde `since` si aún no tiene) y anteriores a `until`.
+    Deja pendiente la nueva marca de cada fuente; se confirma con `commit_watermarks`
+    al terminar la ejecución. Devuelve un resultado por fuente con los ítems ordenados por fecha.
+    """
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    states = database.get_feed_states()
+    marks = database.get_feed_watermarks()
+
+    def conditional_state(source):
+        # Las peticiones condicionales solo valen si la última lectura llegó a confirmarse;
+        # si no, el feed se vuelve a leer entero para recuperar sus ítems
+        state, mark = states.get(source.id), marks.get(source.id)
+        if state is None or mark is None or mark.updated_at is None or mark.updated_at < state.fetched_at:
+            return None
+
+        return state
+
+    async def run(source):
+        async with semaphore:
+            return await fetch_feed(source, conditional_state(source))
+
+    results = await asyncio.gather(*(run(source) for source in sources))
+
+    saved_bytes, saved_time, skipped, new_states = 0, 0.0, 0, []
+    for result in results:
+        if result["error"] is not None:
+            continue
+
+        state = states.get(result["source"].id)
+        if result["status"] != "fetched" and state is not None:
+            skipped += 1
+            saved_bytes += max(0, (state.last_bytes or 0) - result["bytes"])
+            saved_time += max(0.0, (state.last_elapsed or 0.0) - result["elapsed"])
+            log_feeds.info(f"[{result['source'].name}] Feed sin cambios ({result['status']}).")
+
+        new_states.append(_next_state(result, state))
+
+    if new_states:
+        database.save_feed_states(new_states)
+
+    metrics.FEED_SAVED_BYTES.inc(saved_bytes)
+    log_feeds.info(
+        f"Feeds sin cambios: {skipped}/{len(results)}. "
+        f"Ahorrados {saved_bytes} bytes y {saved_time:.2f}s de descarga."
+    )
+
+    pending = {}
+    for result in results:
+        mark = marks.get(result["source"].id)
+        window = [
+            item for item in result["items"]
+            if item["published_at"] <= until and _is_new(item, mark, since)
+        ]
+        window.sort(key=lambda item: (item["published_at"], item["url"]))
+        result["items"] = window
+
+        if result["error"] is None:
+            pending[result["source"].id] = _watermark(window, mark) if window else None
+
+        if result["status"] == "fetched":
+            log_feeds.info(
+                f"[{result['source'].name}] {len(window)} ítems en la ventana "
+                f"({result['bytes']} bytes, {result['elapsed']:.2f}s)."
+            )
+
+    database.stage_feed_watermarks(pending)
+    return results
+
+
+def commit_watermarks() -> int:
+    count = database.commit_feed_watermarks()
+    log_feeds.info(f"Marcas de agua confirmadas para {count} fuentes.")
+    return count
+
+
+# ---------- VALIDACIÓN ----------
+async def _probe_root(response) -> str | None:
+    # Solo se leen los primeros bytes: basta con ver la etiqueta raíz del documento
+    parser = ET.XMLPullParser(events=("start",))
+    size = 0
+
+    async for chunk in response.aiter_bytes():
+        size += len(chunk)
+        parser.feed(chunk)
+        for _, elem in parser.read_events():
+            return elem.tag
+
+        if size >= PROBE_BYTES:
+            break
+
+    return None
+
+
+async def probe_feed(url: str) -> dict:
+    """ Comprueba que una URL sirve un feed RSS/Atom. Devuelve {"valid", "elapsed", "reason"}. """
+    client = http_client.get_client()
+    result = {"valid": False, "elapsed": 0.0, "reason": None}
+    start = time.perf_counter()
+
+    try:
+        with metrics.upstream("feeds", "validate"):
+            async with client.stream("GET", url, timeout=FEED_TIMEOUT) as response:
+                if response.status_code != 200:
+                    raise FeedError(f"HTTP {response.status_code}")
+
+                root = await _probe_root(response)
+                if root not in ROOT_TAGS:
+                    raise FeedError(f"No es un feed (raíz: {root})")
+
+        result["valid"] = True
+
+    except ET.ParseError:
+        result["reason"] = "XML no válido"
+
+    except Exception as e:
+        result["reason"] = str(e) or type(e).__name__
+
+    result["elapsed"] = time.perf_counter() - start
+    return result
+
+
+async def validate(candidates: dict) -> dict:
+    """
+    Valida en paralelo los feeds candidatos ({nombre: {"url", "rss"}}) limitando las
+    peticiones por dominio. Devuelve {nombre: {**candidato, "valid", "elapsed", "reason"}}.
+    """
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    hosts = defaultdict(lambda: asyncio.Semaphore(PER_HOST))
+
+    if not isinstance(candidates, dict):
+        log_feeds.warning(f"Candidatos con formato no válido: {type(candidates).__name__}")
+        return {}
+
+    async def run(name, data):
+        # Una entrada mal formada se descarta sola, sin frenar la validación del resto
+        if not isinstance(data, dict) or not isinstance(data.get('rss'), str) or not isinstance(data.get('url'), str):
+            log_feeds.warning(f"[{name}] Feed descartado: entrada sin url/rss válidos")
+            return name, {"valid": False, "elapsed": 0.0, "reason": "Entrada mal formada"}
+
+        async with semaphore, hosts[urlparse(data['rss']).netloc]:
+            probe = await probe_feed(data['rss'])
+
+        if probe["valid"]:
+            log_feeds.info(f"[{name}] Feed válido ({probe['elapsed']:.2f}s).")
+
+        else:
+            log_feeds.warning(f"[{name}] Feed descartado: {probe['reason']}")
+
+        return name, {**data, **probe}
+
+    results = await asyncio.gather(*(run(name, data) for name, data in candidates.items()))
+    return dict(results)
+
+
+# ---------- EXCLUSIÓN ----------
+def normalize_url(url: str) -> str:
+    """ Forma canónica para comparar URLs: sin esquema, www, puerto por defecto, query ni barra final. """
+    parsed = urlparse(url.strip() if "://" in url else f"https://{url.strip()}")
+    host = (parsed.hostname or "").lower().removeprefix("www.")
+    return f"{host}{parsed.path.rstrip('/')}"
+
+
+def domain_key(url: str) -> str:
+    # En los dominios compartidos por muchos proyectos cuenta también el primer tramo de la ruta
+    host, _, path = normalize_url(url).partition("/")
+    return f"{host}/{path.split('/')[0]}" if host in SHARED_HOSTS and path else host
+
+
+def exclude(candidates: list[str], sources: list) -> list[str]:
+    """
+    Filtra en local las URLs de feed propuestas: descarta las ya almacenadas (como feed o
+    como web), las de dominios que ya tienen fuente y las repetidas entre sí, incluidas
+    las variantes http/https y con o sin www. Las que quedan se devuelven en HTTPS.
+    """
+    urls = {normalize_url(value) for source in sources for value in (source.url, source.rss) if value}
+    domains = {domain_key(value) for source in sources for value in (source.url, source.rss) if value}
+
+    kept = []
+    for candidate in candidates:
+        if not isinstance(candidate, str) or not candidate.strip():
+            continue
+
+        url, domain = normalize_url(candidate), domain_key(candidate)
+        if url in urls or domain in domains:
+            log_feeds.debug(f"Fuente descartada por estar ya almacenada o repetida: {candidate}")
+            continue
+
+        urls.add(url)
+        domains.add(domain)
+        parsed = urlparse(candidate.strip())
+        kept.append(urlunparse(parsed._replace(scheme="https")) if parsed.scheme == "http" else candidate.strip())
+
+    log_feeds.info(f"Exclusión local: {len(kept)}/{len(candidates)} fuentes propuestas son nuevas.")
+    return kept
+
+
+def summarize(sources: list, topics: list[str]) -> dict:
+    """ Resumen compacto del catálogo: número de fuentes por temática (por nombre o URL) y total. """
+    counts = {topic: 0 for topic in topics}
+    for source in sources:
+        text = f"{source.name} {source.url}".lower()
+        for topic in topics:
+            if re.search(rf"(?<![a-z]){re.escape(topic.lower())}(?![a-z])", text):
+                counts[topic] += 1
+
+    return {"total": len(sources), "topics": counts}
@@ -0,0 +1,145 @@
+import asyncio
+import requests
+
+from datetime import datetime
+from requests.auth import HTTPBasicAuth
+
+from modules import database, metrics
+from modules.config import log_gitea, settings
+
+
+GITEA_DATA   = settings['GITEA']
+GITEA_URL    = GITEA_DATA['url']
+GITEA_USER   = GITEA_DATA['user']
+GITEA_TOKEN  = GITEA_DATA['token']
+GITEA_BLOG   = GITEA_DATA['blog']
+GITEA_NEWS   = GITEA_DATA['news']
+
+# Trabajos de construcción por sitio
+JOBS = {
+    "blog": GITEA_BLOG,
+    "news": GITEA_NEWS,
+}
+
+QUIET_WINDOW = GITEA_DATA.get('quiet_window', 60)    # Segundos sin avisos antes de construir
+MAX_DELAY    = GITEA_DATA.get('max_delay', 600)      # Espera máxima desde el primer aviso
+RETRIES      = GITEA_DATA.get('retries', 4)          # Intentos por construcción
+BACKOFF      = GITEA_DATA.get('backoff', 5)          # Espera base entre intentos (exponencial)
+SHUTDOWN_TIMEOUT = GITEA_DATA.get('shutdown_timeout', 30)  # Espera máxima a las construcciones al apagar
+
+_pending = {}       # Sitio -> avisos agrupados a la espera de la ventana de silencio
+_locks = {}         # Sitio -> lock que serializa las construcciones
+_tasks = set()      # Construcciones en curso
+
+
+# ---------- DISPARO ----------
+def _post_build(job: str) -> tuple[int | None, str]:
+    url = f"{GITEA_URL}/job/{job}/job/main/build"
+
+    with metrics.upstream("gitea", "build") as call:
+        try:
+            response = requests.post(url, auth=HTTPBasicAuth(GITEA_USER, GITEA_TOKEN), timeout=30)
+
+        except requests.RequestException as e:
+            call["error"] = True
+            return None, str(e)
+
+        call["error"] = response.status_code != 201
+
+    return response.status_code, response.text
+
+
+async def _build(target: str, batch: dict):
+    lock = _locks.setdefault(target, asyncio.Lock())
+
+    async with lock:
+        log_gitea.info(f"Reconstruyendo [{target}] por {len(batch['reasons'])} avisos: {', '.join(batch['reasons'])}")
+
+        status_code, attempt = None, 0
+        for attempt in range(1, RETRIES + 1):
+            # requests es bloqueante: se ejecuta fuera del event loop
+            status_code, text = await asyncio.to_thread(_post_build, JOBS[target])
+
+            if status_code == 201:
+                log_gitea.info(f"[{target}] reconstruido correctamente.")
+                break
+
+            log_gitea.error(f"Error al reconstruir [{target}] (intento {attempt}/{RETRIES}): {status_code} - {text}")
+            if attempt < RETRIES:
+                await asyncio.sleep(BACKOFF * 2 ** (attempt - 1))
+
+        rebuild = database.Rebuilds(
+            target=target,
+            reasons=", ".join(sorted(set(batch["reasons"]))),
+            triggers=len(batch["reasons"]),
+            requested_at=batch["requested_at"],
+            finished_at=datetime.now(),
+            attempts=attempt,
+            status="success" if status_code == 201 else "failed",
+            status_code=status_code
+        )
+
+        database.save_rebuild(rebuild)
+
+
+def _flush(target: str):
+    batch = _pending.pop(target, None)
+    if batch is None:
+        return
+
+    task = asyncio.create_task(_build(target, batch), name=f"rebuild-{target}")
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+def request_rebuild(target: str, reason: str):
+    """
+    Solicita reconstruir un sitio. Los avisos que llegan dentro de la ventana de
+    silencio se agrupan en una sola construcción.
+    """
+    if target not in JOBS:
+        raise ValueError(f"Sitio desconocido: {target}")
+
+    if not JOBS[target]:
+        log_gitea.warning(f"No hay trabajo configurado para [{target}], se ignora el aviso.")
+        return
+
+    loop = asyncio.get_running_loop()
+    batch = _pending.get(target)
+
+    if batch is None:
+        batch = _pending[target] = {"reasons": [], "requested_at": datetime.now(), "first": loop.time(), "timer": None}
+
+    else:
+        batch["timer"].cancel()
+
+    batch["reasons"].append(reason)
+
+    # Cada aviso reinicia la ventana, sin superar la espera máxima desde el primero
+    delay = min(QUIET_WINDOW, max(0.0, batch["first"] + MAX_DELAY - loop.time()))
+    batch["timer"] = loop.call_later(delay, _flush, target)
+
+    log_gitea.info(f"Reconstrucción de [{target}] solicitada por {reason}, en {delay:.0f}s.")
+
+
+def pending() -> dict:
+    return {
+        target: {"reasons": batch["reasons"], "requested_at": batch["requested_at"]}
+        for target, batch in _pending.items()
+    }
+
+
+async def shutdown():
+    """ Lanza ya las reconstrucciones pendientes y espera a las que están en curso, con un límite. """
+    for target, batch in list(_pending.items()):
+        batch["timer"].cancel()
+        log_gitea.info(f"Reconstrucción pendiente de [{target}] lanzada al apagar.")
+        _flush(target)
+
+    if not _tasks:
+        return
+
+    done, running = await asyncio.wait(set(_tasks), timeout=SHUTDOWN_TIMEOUT)
+    for task in running:
+        task.cancel()
+        log_gitea.warning(f"Reconstrucción [{task.get_name()}] cancelada al apagar tras {SHUTDOWN_TIMEOUT}s.")
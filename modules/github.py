@@ -1,5 +1,6 @@
 import requests
 
+from modules import metrics
 from modules.config import log_github, settings
 
 
@@ -17,10 +18,19 @@ HEADERS = {
 }
 
 
+# Petición GET instrumentada contra la API de GitHub
+def _get(url, operation):
+    with metrics.upstream("github", operation) as call:
+        response = requests.get(url, headers=HEADERS)
+        call["error"] = response.status_code >= 400
+
+    return response
+
+
 # Obtener datos del usuario
 def get_user_info():
     url = f"https://api.github.com/users/{GITHUB_USER}"
-    response = requests.get(url, headers=HEADERS)
+    response = _get(url, "user")
 
     if response.status_code == 200:
         log_github.info("Información del usuario obtenida correctamente.")
@@ -34,7 +44,7 @@ def get_user_info():
 # Obtener la lista de organizaciones del usuario
 def get_user_orgs():
     url = f"https://api.github.com/users/{GITHUB_USER}/orgs"
-    response = requests.get(url, headers=HEADERS)
+    response = _get(url, "orgs")
 
     if response.status_code == 200:
         log_github.info("Información de organizaciones obtenida correctamente.")
@@ -50,7 +60,7 @@ def get_repositories(data, user):
     log_github.info("Fetching user information...")
 
     url = f"https://api.github.com/{data}/{user}/repos?per_page=100"
-    response = requests.get(url, headers=HEADERS)
+    response = _get(url, "repos")
     datas = response.json()
 
     if response.status_code == 200:
@@ -69,8 +79,8 @@ def get_repo_traffic(data, user, repo_name):
     url_views = f"{base_url}/views"
     url_clones = f"{base_url}/clones"
 
-    views_response = requests.get(url_views, headers=HEADERS)
-    clones_response = requests.get(url_clones, headers=HEADERS)
+    views_response = _get(url_views, "traffic")
+    clones_response = _get(url_clones, "traffic")
 
     views = views_response.json() if views_response.status_code == 200 else {}
     clones = clones_response.json() if clones_response.status_code == 200 else {}
@@ -0,0 +1,42 @@
+import httpx
+import importlib.util
+
+from modules.config import settings
+
+
+HTTP_DATA = settings.get('HTTP', {})
+TIMEOUT   = HTTP_DATA.get('timeout', 10)
+LIMITS    = httpx.Limits(
+    max_connections=HTTP_DATA.get('max_connections', 50),
+    max_keepalive_connections=HTTP_DATA.get('max_keepalive', 20),
+    keepalive_expiry=HTTP_DATA.get('keepalive_expiry', 60)
+)
+
+# HTTP/2 solo si está instalado el extra `httpx[http2]`
+HTTP2 = importlib.util.find_spec("h2") is not None
+
+_client = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """ Cliente HTTP compartido: reutiliza conexiones y sesiones TLS entre llamadas. """
+    global _client
+
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=TIMEOUT,
+            limits=LIMITS,
+            http2=HTTP2,
+            follow_redirects=True,
+            headers={"User-Agent": "TechCrafted-API"}
+        )
+
+    return _client
+
+
+async def aclose():
+    global _client
+
+    if _client is not None:
+        await _client.aclose()
+        _client = None
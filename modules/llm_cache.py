@@ -0,0 +1,93 @@
+import json
+import hashlib
+
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+
+from modules import database, metrics
+from modules.config import log_techAI, settings
+
+
+CACHE_DATA  = settings['OPENAI'].get('cache', {})
+STEPS       = set(CACHE_DATA.get('steps', ["tool_analyze_repo", "tool_generate_outline", "tool_markdown_polish"]))
+TTL         = timedelta(days=CACHE_DATA.get('ttl_days', 30))
+MAX_ENTRIES = CACHE_DATA.get('max_entries', 2000)
+DISABLED    = CACHE_DATA.get('bypass', False)
+EVICT_EVERY = CACHE_DATA.get('evict_every', 50)     # Escrituras entre dos limpiezas de la caché
+
+# Permite saltarse la caché en una ejecución concreta (p. ej. regeneración forzada)
+bypass = ContextVar("llm_cache_bypass", default=False)
+
+_stats = {}     # Paso -> {"hits", "misses", "saved_tokens"}
+_stores = 0     # Escrituras desde la última limpieza
+
+
+def _step_stats(step: str) -> dict:
+    return _stats.setdefault(step, {"hits": 0, "misses": 0, "saved_tokens": 0})
+
+
+def make_key(request: dict) -> str:
+    """ Clave de contenido: hash de modelo, parámetros y mensajes de la petición. """
+    canonical = json.dumps(request, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def enabled(step: str | None) -> bool:
+    return step in STEPS and not DISABLED and not bypass.get()
+
+
+def lookup(step: str, key: str) -> str | None:
+    # Las entradas caducadas no se devuelven ni suman aciertos
+    entry = database.get_llm_cache(key, datetime.now() - TTL)
+
+    if entry is not None:
+        stats = _step_stats(step)
+        stats["hits"] += 1
+        stats["saved_tokens"] += entry.tokens
+
+        metrics.LLM_CACHE_REQUESTS.inc(step=step, result="hit")
+        metrics.LLM_CACHE_SAVED_TOKENS.inc(entry.tokens, step=step)
+        log_techAI.info(f"[{step}] Respuesta recuperada de caché ({entry.tokens} tokens ahorrados).")
+        return entry.response
+
+    _step_stats(step)["misses"] += 1
+    metrics.LLM_CACHE_REQUESTS.inc(step=step, result="miss")
+    return None
+
+
+def store(step: str, key: str, model: str, response: str, tokens: int):
+    now = datetime.now()
+    entry = database.LLMCache(
+        key=key,
+        step=step,
+        model=model,
+        response=response,
+        tokens=tokens,
+        hits=0,
+        created_at=now,
+        last_hit_at=now
+    )
+
+    database.save_llm_cache(entry)
+
+    # La limpieza recorre toda la tabla: solo cada EVICT_EVERY escrituras
+    global _stores
+    _stores += 1
+    if _stores >= EVICT_EVERY:
+        _stores = 0
+        database.evict_llm_cache(now - TTL, MAX_ENTRIES)
+
+
+def stats() -> dict:
+    report = {}
+    for step, values in _stats.items():
+        total = values["hits"] + values["misses"]
+        report[step] = {**values, "hit_rate": round(values["hits"] / total, 3) if total else 0.0}
+
+    return {
+        "enabled_steps": sorted(STEPS),
+        "disabled": DISABLED,
+        "ttl_days": TTL.days,
+        "max_entries": MAX_ENTRIES,
+        "steps": report,
+    }
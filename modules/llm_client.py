@@ -0,0 +1,466 @@
+import math
+import time
+import random
+import asyncio
+
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from openai import RateLimitError, APIConnectionError, APITimeoutError, InternalServerError
+
+from modules import database, metrics
+from modules.config import log_techAI, settings
+
+
+LIMITS_DATA  = settings['OPENAI'].get('limits', {})
+MAX_RETRIES  = settings['OPENAI'].get('max_retries', 5)
+BACKOFF_BASE = settings['OPENAI'].get('backoff_base', 1.0)    # Segundos del primer reintento
+BACKOFF_MAX  = settings['OPENAI'].get('backoff_max', 60.0)    # Tope de espera entre reintentos
+
+DEFAULT_LIMITS = {"rpm": 500, "tpm": 30000}
+
+# Plazo máximo por paso (segundos, reintentos incluidos); al agotarse se cancela la llamada
+DEADLINES_DATA = settings['OPENAI'].get('deadlines', {})
+DEFAULT_DEADLINE = DEADLINES_DATA.get('default', 300)
+
+# Peticiones duplicadas para pasos baratos e idempotentes
+HEDGE_DATA        = settings['OPENAI'].get('hedge', {})
+HEDGE_STEPS       = set(HEDGE_DATA.get('steps', ["tool_generate_outline"]))
+HEDGE_QUANTILE    = HEDGE_DATA.get('quantile', 0.95)     # Percentil de latencia tras el que se duplica
+HEDGE_MIN_DELAY   = HEDGE_DATA.get('min_delay', 2.0)     # Espera mínima antes de duplicar
+HEDGE_MIN_SAMPLES = HEDGE_DATA.get('min_samples', 20)    # Muestras necesarias para estimar el percentil
+
+RETRYABLE = (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError)
+
+_stats = {}     # Paso -> {"calls", "retries", "pacing_wait", "backoff_wait", "deadlines", "hedges", "hedge_wins"}
+_latencies = {} # Paso -> últimas latencias de llamadas con éxito
+
+# Pipeline en curso; lo fija techAI._run_pipeline para contabilizar cada llamada
+pipeline = ContextVar("llm_pipeline", default="none")
+
+
+class TokenBucket:
+    """ Cubo de tokens con recarga continua; el saldo puede quedar negativo tras un ajuste. """
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float) -> float:
+        amount = min(amount, self.capacity)
+        waited = 0.0
+
+        async with self._lock:
+            self._refill()
+            while self.tokens < amount:
+                delay = (amount - self.tokens) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+                self._refill()
+
+            self.tokens -= amount
+
+        return waited
+
+    def adjust(self, delta: float):
+        self._refill()
+        self.tokens -= delta
+
+
+_buckets = {}   # Modelo -> (cubo de peticiones, cubo de tokens)
+
+
+def _buckets_for(model: str) -> tuple[TokenBucket, TokenBucket]:
+    if model not in _buckets:
+        limits = {**DEFAULT_LIMITS, **LIMITS_DATA.get("default", {}), **LIMITS_DATA.get(model, {})}
+        _buckets[model] = (TokenBucket(limits["rpm"]), TokenBucket(limits["tpm"]))
+
+    return _buckets[model]
+
+
+def estimate_tokens(request: dict) -> int:
+    """ Estimación previa (≈4 caracteres por token) del prompt más la salida reservada. """
+    chars = 0
+    for message in request.get("messages", []) + request.get("input", []):
+        content = message.get("content", "")
+        if isinstance(content, list):
+            chars += sum(len(part.get("text", "")) for part in content)
+
+        else:
+            chars += len(content)
+
+    output = request.get("max_output_tokens") or request.get("max_tokens") or 1024
+    return chars // 4 + output
+
+
+def _retry_after(error: Exception) -> float | None:
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+
+    headers = response.headers
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+
+    except ValueError:
+        pass
+
+    return None
+
+
+def _usage(response) -> tuple[int, int, int]:
+    """ Tokens (entrada, salida, razonamiento) de una respuesta de chat.completions o responses. """
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return 0, 0, 0
+
+    if hasattr(usage, "input_tokens"):
+        details = getattr(usage, "output_tokens_details", None)
+        return usage.input_tokens or 0, usage.output_tokens or 0, getattr(details, "reasoning_tokens", 0) or 0
+
+    details = getattr(usage, "completion_tokens_details", None)
+    return usage.prompt_tokens or 0, usage.completion_tokens or 0, getattr(details, "reasoning_tokens", 0) or 0
+
+
+def _record(step: str, model: str, operation: str, response, latency: float, retries: int, status: str):
+    input_tokens, output_tokens, reasoning_tokens = _usage(response)
+    try:
+        database.save_llm_call(database.LLMCalls(
+            pipeline=pipeline.get(),
+            step=step,
+            model=model,
+            operation=operation,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            reasoning_tokens=reasoning_tokens,
+            latency=latency,
+            retries=retries,
+            status=status,
+            created_at=datetime.now()
+        ))
+
+    except Exception as e:
+        # La contabilidad nunca debe romper la llamada
+        log_techAI.warning(f"[{step}] No se pudo registrar la llamada al LLM: {e}")
+
+
+def _step_stats(step: str) -> dict:
+    return _stats.setdefault(step, {
+        "calls": 0, "retries": 0, "pacing_wait": 0.0, "backoff_wait": 0.0,
+        "deadlines": 0, "hedges": 0, "hedge_wins": 0
+    })
+
+
+def _hedge_delay(step: str) -> float | None:
+    samples = _latencies.get(step)
+    if step not in HEDGE_STEPS or samples is None or len(samples) < HEDGE_MIN_SAMPLES:
+        return None
+
+    return max(HEDGE_MIN_DELAY, _percentile(sorted(samples), HEDGE_QUANTILE))
+
+
+async def _send(create, request: dict, operation: str, step: str):
+    """
+    Envía la petición. En los pasos con hedging, si no hay respuesta tras el p95 de
+    latencia del paso se lanza una segunda petición y se usa la primera que responda.
+    """
+    async def attempt():
+        with metrics.upstream("openai", operation):
+            return await create(**request)
+
+    delay = None if request.get("stream") else _hedge_delay(step)
+    start = time.perf_counter()
+
+    if delay is None:
+        response = await attempt()
+
+    else:
+        primary = asyncio.ensure_future(attempt())
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                # La petición duplicada consume presupuesto como cualquier otra
+                requests_bucket, tokens_bucket = _buckets_for(request["model"])
+                await requests_bucket.acquire(1)
+                await tokens_bucket.acquire(estimate_tokens(request))
+
+                tasks.append(asyncio.ensure_future(attempt()))
+                _step_stats(step)["hedges"] += 1
+                log_techAI.debug(f"[{step}] Sin respuesta tras {delay:.1f}s, se duplica la petición.")
+
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = next((task for task in done if task.exception() is None), None)
+                if winner is not None:
+                    break
+
+            else:
+                # Todas fallaron: se propaga el error de la original
+                winner = primary
+
+            if len(tasks) > 1:
+                hedge_won = winner is tasks[1] and winner.exception() is None
+                _step_stats(step)["hedge_wins"] += hedge_won
+                metrics.LLM_HEDGES.inc(step=step, winner="hedge" if hedge_won else "primary")
+
+            response = winner.result()
+
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    samples = _latencies.setdefault(step, deque(maxlen=200))
+    samples.append(time.perf_counter() - start)
+    return response
+
+
+async def call(create, request: dict, operation: str, step: str = None, clock: dict = None):
+    """
+    Ejecuta una llamada a OpenAI con el plazo máximo del paso. El plazo cuenta el tiempo de
+    las peticiones y de las esperas entre reintentos, no la espera por el presupuesto RPM/TPM.
+    Si se agota, la llamada en curso se cancela y se lanza `TimeoutError`.
+    `clock["left"]` queda con los segundos de plazo restantes.
+    """
+    step = step or "unknown"
+    deadline = DEADLINES_DATA.get(step, DEFAULT_DEADLINE)
+    clock = clock if clock is not None else {}
+    clock["left"] = deadline
+    start = time.perf_counter()
+
+    try:
+        return await _call(create, request, operation, step, start, clock)
+
+    except asyncio.TimeoutError:
+        _step_stats(step)["deadlines"] += 1
+        metrics.LLM_DEADLINES.inc(step=step)
+        _record(step, request["model"], operation, None, time.perf_counter() - start, 0, "timeout")
+        log_techAI.error(f"[{step}] Plazo de {deadline}s agotado, llamada cancelada.")
+        raise
+
+
+async def _call(create, request: dict, operation: str, step: str, start: float, clock: dict):
+    """
+    Respeta los presupuestos RPM/TPM del modelo y reintenta errores transitorios con
+    backoff exponencial, jitter y `retry-after`.
+    """
+    stats = _step_stats(step)
+    requests_bucket, tokens_bucket = _buckets_for(request["model"])
+    estimate = estimate_tokens(request)
+
+    for attempt in range(MAX_RETRIES + 1):
+        waited = await requests_bucket.acquire(1) + await tokens_bucket.acquire(estimate)
+        if waited:
+            stats["pacing_wait"] += waited
+            metrics.LLM_PACING_WAIT.observe(waited, model=request["model"])
+            log_techAI.debug(f"[{step}] Esperando {waited:.1f}s por el presupuesto de {request['model']}.")
+
+        # El plazo empieza a contar una vez concedido el presupuesto
+        sent = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(_send(create, request, operation, step), clock["left"])
+            clock["left"] -= time.perf_counter() - sent
+
+            stats["calls"] += 1
+            if request.get("stream"):
+                # El consumo real se conoce al terminar el stream; lo ajusta y registra `stream`
+                return response
+
+            usage = getattr(response, "usage", None)
+            if usage is not None and getattr(usage, "total_tokens", None):
+                tokens_bucket.adjust(usage.total_tokens - estimate)
+
+            _record(step, request["model"], operation, response, time.perf_counter() - start, attempt, "success")
+            return response
+
+        except RETRYABLE as e:
+            # La petición fallida no consumió tokens: se devuelven al cubo
+            tokens_bucket.adjust(-estimate)
+            if attempt == MAX_RETRIES:
+                _record(step, request["model"], operation, None, time.perf_counter() - start, attempt, "failed")
+                raise
+
+            delay = _retry_after(e)
+            if delay is None:
+                delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+            clock["left"] -= time.perf_counter() - sent + delay
+            if clock["left"] <= 0:
+                raise asyncio.TimeoutError()
+
+            stats["retries"] += 1
+            stats["backoff_wait"] += delay
+            metrics.LLM_RETRIES.inc(step=step, reason=type(e).__name__)
+            log_techAI.warning(
+                f"[{step}] {type(e).__name__} en OpenAI, reintento {attempt + 1}/{MAX_RETRIES} en {delay:.1f}s."
+            )
+            await asyncio.sleep(delay)
+
+        except asyncio.TimeoutError:
+            # Plazo agotado: lo registra `call`
+            raise
+
+        except asyncio.CancelledError:
+            _record(step, request["model"], operation, None, time.perf_counter() - start, attempt, "cancelled")
+            raise
+
+        except Exception:
+            # Errores no recuperables (BadRequestError, otros APIStatusError...): también cuentan
+            _record(step, request["model"], operation, None, time.perf_counter() - start, attempt, "error")
+            raise
+
+
+def stats() -> dict:
+    return {
+        "max_retries": MAX_RETRIES,
+        "budgets": {
+            model: {"rpm": buckets[0].capacity, "tpm": buckets[1].capacity}
+            for model, buckets in _buckets.items()
+        },
+        "steps": {
+            step: {**values, "pacing_wait": round(values["pacing_wait"], 2), "backoff_wait": round(values["backoff_wait"], 2)}
+            for step, values in _stats.items()
+        },
+    }
+
+
+async def stream(create, request: dict, operation: str, step: str = None):
+    """
+    Variante de `call` en streaming: aplica el mismo control de ritmo y reintentos a la apertura
+    del stream y reenvía los eventos. Los eventos que traen `usage` (el `response.completed` de
+    responses o el último chunk de chat.completions) sirven para ajustar y registrar el consumo.
+    """
+    step = step or "unknown"
+    start = time.perf_counter()
+    clock = {}
+    events = await call(create, {**request, "stream": True}, operation, step, clock)
+
+    # Lo que queda del plazo tras abrir el stream limita la lectura de cada evento
+    end = time.perf_counter() + clock["left"]
+    iterator = aiter(events)
+
+    final, status = None, "failed"
+    try:
+        while True:
+            try:
+                event = await asyncio.wait_for(anext(iterator), max(0.0, end - time.perf_counter()))
+
+            except StopAsyncIteration:
+                break
+
+            except asyncio.TimeoutError:
+                status = "timeout"
+                _step_stats(step)["deadlines"] += 1
+                metrics.LLM_DEADLINES.inc(step=step)
+                log_techAI.error(f"[{step}] Plazo agotado leyendo el stream, llamada cancelada.")
+                if hasattr(events, "close"):
+                    await events.close()
+                raise
+
+            if getattr(event, "usage", None) is not None:
+                final = event
+
+            elif getattr(event, "type", None) == "response.completed":
+                final = event.response
+
+            yield event
+
+        status = "success"
+
+    finally:
+        usage = getattr(final, "usage", None)
+        if usage is not None and getattr(usage, "total_tokens", None):
+            _buckets_for(request["model"])[1].adjust(usage.total_tokens - estimate_tokens(request))
+
+        _record(step, request["model"], operation, final, time.perf_counter() - start, 0, status)
+
+
+def _percentile(values: list, q: float) -> float:
+    # Percentil por rango más cercano sobre valores ya ordenados
+    if not values:
+        return 0.0
+
+    return values[max(0, math.ceil(q * len(values)) - 1)]
+
+
+def _summarize(rows: list) -> dict:
+    latencies = sorted(row.latency for row in rows)
+    return {
+        "calls": len(rows),
+        "failed": sum(1 for row in rows if row.status != "success"),
+        "retries": sum(row.retries for row in rows),
+        "latency_p50": round(_percentile(latencies, 0.50), 3),
+        "latency_p95": round(_percentile(latencies, 0.95), 3),
+        "input_tokens": sum(row.input_tokens for row in rows),
+        "output_tokens": sum(row.output_tokens for row in rows),
+        "reasoning_tokens": sum(row.reasoning_tokens for row in rows),
+    }
+
+
+def _compare_pipelines(rows: list, since: datetime) -> dict:
+    """
+    Coste por ejecución completada de cada pipeline: duración p50/p95, llamadas y tokens medios.
+    Solo cuentan las llamadas hechas durante una ejecución completada; las fallidas se informan aparte.
+    """
+    durations, windows, failed = {}, {}, {}
+    for run in database.get_pipeline_runs(since):
+        durations.setdefault(run.pipeline, []).append((run.finished_at - run.started_at).total_seconds())
+        windows.setdefault(run.pipeline, []).append((run.started_at, run.finished_at))
+
+    for run in database.get_pipeline_runs(since, status="failed"):
+        failed[run.pipeline] = failed.get(run.pipeline, 0) + 1
+
+    report = {}
+    for name, values in durations.items():
+        calls = [
+            row for row in rows
+            if row.pipeline == name and any(start <= row.created_at <= end for start, end in windows[name])
+        ]
+        values.sort()
+        report[name] = {
+            "runs": len(values),
+            "failed_runs": failed.get(name, 0),
+            "duration_p50": round(_percentile(values, 0.50), 2),
+            "duration_p95": round(_percentile(values, 0.95), 2),
+            "calls_per_run": round(len(calls) / len(values), 2),
+            "tokens_per_run": round(sum(row.input_tokens + row.output_tokens for row in calls) / len(values)),
+        }
+
+    return report
+
+
+def report(weeks: int = 4) -> dict:
+    """ Agrega las llamadas registradas por paso y por semana ISO (p50/p95 de latencia y tokens). """
+    since = datetime.now() - timedelta(weeks=weeks)
+    rows = database.get_llm_calls(since)
+
+    by_step, by_week = {}, {}
+    for row in rows:
+        year, week, _ = row.created_at.isocalendar()
+        by_step.setdefault(row.step, []).append(row)
+        by_week.setdefault(f"{year}-W{week:02d}", {}).setdefault(row.step, []).append(row)
+
+    return {
+        "weeks": weeks,
+        "calls": len(rows),
+        "pipelines": _compare_pipelines(rows, since),
+        "steps": {step: _summarize(values) for step, values in sorted(by_step.items())},
+        "by_week": {
+            week: {step: _summarize(values) for step, values in sorted(steps.items())}
+            for week, steps in sorted(by_week.items())
+        },
+    }
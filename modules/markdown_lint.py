@@ -0,0 +1,86 @@
+import re
+
+
+FENCE = re.compile(r"^\s*(```|~~~)")
+# CommonMark: espacio tras los # de apertura; solo se quita el cierre ` ###` precedido de espacio (C# se conserva)
+HEADING = re.compile(r"^(#{1,6})(?:[ \t]+(.*?))?(?:[ \t]+#+)?[ \t]*$")
+BULLET = re.compile(r"^(\s*)[*+]\s+")
+
+
+def _unwrap(text: str) -> str:
+    # El modelo a veces envuelve el artículo entero en ```markdown ... ```
+    match = re.fullmatch(r"\s*```(?:markdown|md)?\n(.*?)\n```\s*", text, flags=re.S)
+    return match.group(1) if match else text
+
+
+def lint(markdown: str, title: str = None) -> tuple[str, int]:
+    """
+    Corrector local que sustituye al paso de pulido con el LLM: normaliza encabezados,
+    viñetas, espacios y bloques de código sin tocar el contenido. Devuelve (texto, correcciones).
+    """
+    lines = _unwrap(markdown.replace("\r\n", "\n")).split("\n")
+    output, fixes, in_code, has_h1 = [], 0, False, False
+
+    def blank_before():
+        nonlocal fixes
+        if output and output[-1] != "":
+            output.append("")
+            fixes += 1
+
+    for line in lines:
+        if FENCE.match(line):
+            if not in_code:
+                blank_before()
+
+            in_code = not in_code
+            output.append(line.rstrip())
+            if not in_code:
+                output.append("")
+            continue
+
+        if in_code:
+            output.append(line)
+            continue
+
+        stripped = line.rstrip()
+        fixes += stripped != line
+
+        heading = HEADING.match(stripped)
+        if heading and heading.group(2):
+            level = len(heading.group(1))
+
+            # Un único H1: los siguientes bajan a H2
+            if level == 1 and has_h1:
+                level = 2
+
+            has_h1 = has_h1 or level == 1
+            fixed = f"{'#' * level} {heading.group(2)}"
+            fixes += fixed != stripped
+
+            blank_before()
+            output.extend([fixed, ""])
+            continue
+
+        # Varias líneas en blanco seguidas se reducen a una (fuera de los bloques de código)
+        if not stripped and (not output or output[-1] == ""):
+            continue
+
+        bullet = BULLET.match(stripped)
+        if bullet:
+            stripped = BULLET.sub(r"\1- ", stripped, count=1)
+            fixes += 1
+
+        output.append(stripped)
+
+    # Bloque de código sin cerrar
+    if in_code:
+        output.append("```")
+        fixes += 1
+
+    text = "\n".join(output).strip()
+
+    if title and not has_h1:
+        text = f"# {title}\n\n{text}"
+        fixes += 1
+
+    return text + "\n", fixes
@@ -0,0 +1,259 @@
+import time
+import threading
+
+from contextlib import contextmanager
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+_lock = threading.Lock()
+_registry = []
+_collectors = []
+
+
+# ---------- TIPOS DE MÉTRICA ----------
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        _registry.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(name, "") for name in self.labels)
+
+    def _samples(self):
+        for key, value in self._values.items():
+            yield self.name, _format_labels(self.labels, key), value
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with _lock:
+            samples = list(self._samples())
+
+        lines.extend(f"{name}{labels} {_format_value(value)}" for name, labels, value in samples)
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with _lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with _lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["buckets"][i] += 1
+                    break
+
+            series["sum"] += value
+            series["count"] += 1
+
+    def _samples(self):
+        for key, series in self._values.items():
+            cumulative = 0
+            for bound, hits in zip(self.buckets, series["buckets"]):
+                cumulative += hits
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket", _format_labels(self.labels, key, le), cumulative
+
+            yield f"{self.name}_sum", _format_labels(self.labels, key), series["sum"]
+            yield f"{self.name}_count", _format_labels(self.labels, key), series["count"]
+
+
+def collector(func):
+    """ Registra una función que actualiza métricas justo antes de exportarlas. """
+    _collectors.append(func)
+    return func
+
+
+def render() -> str:
+    for func in _collectors:
+        func()
+
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+
+    return "\n".join(lines) + "\n"
+
+
+# ---------- MÉTRICAS DE LA APLICACIÓN ----------
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "Latencia de las peticiones HTTP por ruta.", ("method", "route"))
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "Peticiones HTTP por ruta y código de estado.", ("method", "route", "status"))
+
+JOB_DURATION = Histogram(
+    "scheduler_job_duration_seconds", "Duración de los jobs del scheduler.", ("job",))
+JOB_RUNS = Counter(
+    "scheduler_job_runs_total", "Ejecuciones de los jobs del scheduler por resultado.", ("job", "outcome"))
+
+UPSTREAM_LATENCY = Histogram(
+    "upstream_request_duration_seconds", "Latencia de las llamadas a servicios externos.", ("service", "operation"))
+UPSTREAM_ERRORS = Counter(
+    "upstream_errors_total", "Errores en llamadas a servicios externos.", ("service", "operation"))
+
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds", "Duración de las consultas SQL.",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1))
+DB_POOL = Gauge(
+    "db_pool_connections", "Estado del pool de conexiones de la base de datos.", ("state",))
+
+ADMISSION_ACTIVE = Gauge(
+    "admission_active_requests", "Peticiones en ejecución por limitador.", ("limiter",))
+ADMISSION_QUEUE = Gauge(
+    "admission_queue_depth", "Peticiones esperando turno por limitador.", ("limiter",))
+ADMISSION_WAIT = Histogram(
+    "admission_wait_seconds", "Tiempo de espera en cola antes de ser admitido.", ("limiter",))
+ADMISSION_REJECTED = Counter(
+    "admission_rejected_total", "Peticiones rechazadas con 429 por limitador y motivo.", ("limiter", "reason"))
+
+LLM_CACHE_REQUESTS = Counter(
+    "llm_cache_requests_total", "Consultas a la caché del LLM por paso y resultado.", ("step", "result"))
+LLM_CACHE_SAVED_TOKENS = Counter(
+    "llm_cache_saved_tokens_total", "Tokens ahorrados por la caché del LLM por paso.", ("step",))
+
+LLM_RETRIES = Counter(
+    "llm_retries_total", "Reintentos de llamadas a OpenAI por paso y tipo de error.", ("step", "reason"))
+LLM_PACING_WAIT = Histogram(
+    "llm_pacing_wait_seconds", "Espera por los presupuestos RPM/TPM antes de llamar a OpenAI.", ("model",))
+LLM_DEADLINES = Counter(
+    "llm_deadline_exceeded_total", "Llamadas a OpenAI canceladas por agotar el plazo del paso.", ("step",))
+LLM_HEDGES = Counter(
+    "llm_hedges_total", "Peticiones duplicadas por paso y cuál respondió antes (primary, hedge).", ("step", "winner"))
+
+FEED_FETCHES = Counter(
+    "feed_fetches_total", "Descargas de feeds por resultado (fetched, not_modified, unchanged, error).", ("result",))
+FEED_SAVED_BYTES = Counter(
+    "feed_saved_bytes_total", "Bytes de feeds que no se descargaron gracias a la caché de estado.")
+
+
+
+# ---------- INSTRUMENTACIÓN ----------
+@contextmanager
+def upstream(service: str, operation: str):
+    """
+    Mide una llamada a un servicio externo (github, openai, gitea).
+    El bloque puede marcar `call["error"] = True` si la respuesta no es válida.
+    """
+    call = {"error": False}
+    start = time.perf_counter()
+
+    try:
+        yield call
+
+    except BaseException:
+        call["error"] = True
+        raise
+
+    finally:
+        UPSTREAM_LATENCY.observe(time.perf_counter() - start, service=service, operation=operation)
+        if call["error"]:
+            UPSTREAM_ERRORS.inc(service=service, operation=operation)
+
+
+def job(func, name: str):
+    """ Envuelve un job del scheduler para medir su duración y resultado. """
+    async def wrapper(*args, **kwargs):
+        outcome = "error"
+        start = time.perf_counter()
+
+        try:
+            result = await func(*args, **kwargs)
+            # Los endpoints reutilizados como jobs devuelven {"error": ...} en lugar de lanzar
+            if not (isinstance(result, dict) and "error" in result):
+                outcome = "success"
+
+            return result
+
+        finally:
+            JOB_DURATION.observe(time.perf_counter() - start, job=name)
+            JOB_RUNS.inc(job=name, outcome=outcome)
+
+    wrapper.__name__ = getattr(func, "__name__", name)
+    return wrapper
+
+
+class MetricsMiddleware:
+    """ Middleware ASGI que mide latencia y códigos de estado por plantilla de ruta. """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+
+        finally:
+            # La plantilla de ruta evita una serie por cada ID concreto
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_LATENCY.observe(time.perf_counter() - start, method=scope["method"], route=route)
+            HTTP_REQUESTS.inc(method=scope["method"], route=route, status=status["code"])
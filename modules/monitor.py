@@ -0,0 +1,192 @@
+import sys
+import time
+import asyncio
+import threading
+import traceback
+
+from collections import deque
+
+from modules.config import log_monitor, settings
+
+
+MONITOR_DATA = settings.get('MONITOR', {})
+INTERVAL     = MONITOR_DATA.get('loop_interval', 0.5)     # Segundos entre sondas del event loop
+THRESHOLD    = MONITOR_DATA.get('loop_threshold', 0.25)   # Retraso a partir del cual se considera bloqueo
+WINDOW       = MONITOR_DATA.get('loop_window', 1200)      # Muestras conservadas para los percentiles
+
+_samples = deque(maxlen=WINDOW)   # Retrasos medidos (segundos)
+_stalls = deque(maxlen=20)        # Últimos bloqueos detectados
+_activities = {}                  # Tarea asyncio -> endpoint o job que la ejecuta
+
+_state = {
+    "loop": None,
+    "thread_id": None,
+    "probe": None,
+    "watchdog": None,
+    "stop": threading.Event(),
+    "last_beat": 0.0,
+}
+
+
+# ---------- ACTIVIDADES ----------
+def _label(activity) -> str:
+    # Las peticiones HTTP guardan el scope ASGI: la ruta se resuelve tras el enrutado
+    if isinstance(activity, dict):
+        route = activity.get("route")
+        path = getattr(route, "path", None) or activity.get("path", "")
+        return f"{activity.get('method', '')} {path}".strip()
+
+    return str(activity)
+
+
+def track(activity):
+    """
+    Asocia la tarea asyncio actual con un endpoint (scope ASGI) o un job (nombre).
+    Devuelve la tarea para poder liberarla con `untrack`.
+    """
+    task = asyncio.current_task()
+    if task is not None:
+        _activities[task] = activity
+
+    return task
+
+
+def untrack(task):
+    _activities.pop(task, None)
+
+
+def job(func, name: str):
+    """ Envuelve un job del scheduler para que el vigilante pueda nombrarlo. """
+    async def wrapper(*args, **kwargs):
+        task = track(f"job:{name}")
+        try:
+            return await func(*args, **kwargs)
+
+        finally:
+            untrack(task)
+
+    wrapper.__name__ = getattr(func, "__name__", name)
+    return wrapper
+
+
+class ActivityMiddleware:
+    """ Middleware ASGI que registra qué endpoint ejecuta cada tarea del event loop. """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        task = track(scope)
+        try:
+            await self.app(scope, receive, send)
+
+        finally:
+            untrack(task)
+
+
+# ---------- SONDA Y VIGILANTE ----------
+async def _probe():
+    loop = asyncio.get_running_loop()
+
+    while True:
+        _state["last_beat"] = time.monotonic()
+        start = loop.time()
+        await asyncio.sleep(INTERVAL)
+        lag = max(0.0, loop.time() - start - INTERVAL)
+        _samples.append(lag)
+
+        if lag >= THRESHOLD:
+            log_monitor.warning(f"Retraso del event loop: {lag * 1000:.0f} ms")
+
+
+def _watchdog():
+    # Hilo aparte: si la sonda no late es que algo bloquea el event loop
+    reported = False
+    stop = _state["stop"]
+
+    while not stop.wait(INTERVAL / 2):
+        blocked = time.monotonic() - _state["last_beat"] - INTERVAL
+
+        if blocked < THRESHOLD:
+            reported = False
+            continue
+
+        if reported:
+            continue
+
+        reported = True
+        _report_stall(blocked)
+
+
+def _report_stall(blocked: float):
+    loop = _state["loop"]
+    task = asyncio.current_task(loop) if loop is not None else None
+    activity = _label(_activities[task]) if task in _activities else "desconocido"
+
+    frame = sys._current_frames().get(_state["thread_id"])
+    stack = "".join(traceback.format_stack(frame)) if frame is not None else ""
+
+    _stalls.append({
+        "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "blocked_ms": round(blocked * 1000),
+        "activity": activity,
+        "task": task.get_name() if task is not None else None,
+        "stack": stack,
+    })
+
+    log_monitor.warning(f"Event loop bloqueado {blocked * 1000:.0f} ms por [{activity}]\n{stack}")
+
+
+def start():
+    if _state["probe"] is not None:
+        return
+
+    _state["loop"] = asyncio.get_running_loop()
+    _state["thread_id"] = threading.get_ident()
+    _state["last_beat"] = time.monotonic()
+    _state["stop"].clear()
+
+    _state["probe"] = asyncio.create_task(_probe(), name="loop-monitor")
+    _state["watchdog"] = threading.Thread(target=_watchdog, name="loop-watchdog", daemon=True)
+    _state["watchdog"].start()
+
+    log_monitor.info(f"Vigilante del event loop activo (intervalo {INTERVAL}s, umbral {THRESHOLD}s).")
+
+
+def stop():
+    if _state["probe"] is None:
+        return
+
+    _state["stop"].set()
+    _state["probe"].cancel()
+    _state["probe"] = None
+    _state["watchdog"] = None
+
+
+# ---------- ESTADÍSTICAS ----------
+def _percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+
+    index = min(len(values) - 1, int(round(q * (len(values) - 1))))
+    return values[index]
+
+
+def lag_stats() -> dict:
+    values = sorted(_samples)
+
+    return {
+        "interval_ms": INTERVAL * 1000,
+        "threshold_ms": THRESHOLD * 1000,
+        "samples": len(values),
+        "lag_ms": {
+            "p50": round(_percentile(values, 0.50) * 1000, 2),
+            "p90": round(_percentile(values, 0.90) * 1000, 2),
+            "p99": round(_percentile(values, 0.99) * 1000, 2),
+            "max": round(values[-1] * 1000, 2) if values else 0.0,
+        },
+        "stalls": list(_stalls),
+    }
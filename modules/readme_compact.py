@@ -0,0 +1,135 @@
+import re
+
+from modules.config import log_techAI, settings
+
+
+README_DATA    = settings['OPENAI'].get('readme', {})
+ANALYZE_BUDGET = README_DATA.get('analyze_tokens', 200)      # Tokens de README para tool_analyze_repo (≈800 caracteres)
+WRITE_BUDGET   = README_DATA.get('write_tokens', 1000)       # Tokens de README para tool_write_post (≈4000 caracteres)
+CODE_LINES     = README_DATA.get('code_lines', 8)            # Líneas conservadas de cada bloque de código
+
+
+def _words(*alternatives: str) -> re.Pattern:
+    # Palabras completas: "toc" no debe casar con "Autocomplete" ni "api" con "Rapid"
+    return re.compile(r"\b(?:" + "|".join(alternatives) + r")\b", re.I)
+
+
+# Secciones que se descartan siempre y prioridad de las demás (mayor = antes en el presupuesto)
+DROP_SECTIONS = _words(
+    r"table of contents", r"contents", r"toc", r"índice", r"indice", r"tabla de contenidos",
+    r"license", r"licence", r"licencia", r"contributors", r"contribuidores", r"sponsors",
+    r"patrocinadores", r"acknowledg\w*", r"agradecimientos"
+)
+PRIORITY = [
+    (3, _words(r"about", r"overview", r"introduc\w*", r"why", r"features?", r"what", r"acerca",
+               r"descripci\w*", r"caracter\w*", r"por qué", r"qué es")),
+    (2, _words(r"usage", r"examples?", r"quick ?start", r"getting started", r"demo", r"uso", r"ejemplos?",
+               r"cómo usar", r"primeros pasos")),
+    (1, _words(r"install\w*", r"setup", r"config\w*", r"requirements", r"instalaci\w*", r"configuraci\w*",
+               r"requisitos", r"api")),
+    (-1, _words(r"contribut\w*", r"changelog", r"faq", r"support", r"credits", r"authors", r"roadmap",
+                r"contribuir", r"soporte", r"autores")),
+]
+
+HEADING = re.compile(r"^(#{1,6})\s+(.*)$")
+
+
+def count_tokens(text: str) -> int:
+    # Misma aproximación que el control de ritmo: ≈4 caracteres por token
+    return len(text) // 4
+
+
+def _collapse_code(match: re.Match) -> str:
+    fence, body = match.group(1), match.group(2).splitlines()
+    if len(body) <= CODE_LINES:
+        return match.group(0)
+
+    return "\n".join([fence, *body[:CODE_LINES], "# …", "```"])
+
+
+def clean(text: str) -> str:
+    """ Quita badges, HTML, imágenes, enlaces de índice y comentarios, y acorta los bloques de código. """
+    text = re.sub(r"<!--.*?-->", "", text, flags=re.S)
+    text = re.sub(r"(```[^\n]*)\n(.*?)\n```", _collapse_code, text, flags=re.S)
+
+    # Badges e imágenes (también enlazadas) y sus definiciones por referencia
+    text = re.sub(r"\[!\[[^\]]*\]\([^)]*\)\]\([^)]*\)", "", text)
+    text = re.sub(r"!\[[^\]]*\]\([^)]*\)", "", text)
+    text = re.sub(r"!\[[^\]]*\]\[[^\]]*\]", "", text)
+    text = re.sub(r"^\s*\[[^\]]+\]:\s*\S+.*$", "", text, flags=re.M)
+
+    # HTML: fuera imágenes y etiquetas, se conserva el texto
+    text = re.sub(r"<(img|picture|source|svg)\b[^>]*>", "", text, flags=re.I)
+    text = re.sub(r"</?[a-zA-Z][^>]*>", "", text)
+
+    # Listas de anclas (índices sin encabezado) y separadores
+    text = re.sub(r"^\s*[-*+]\s*\[[^\]]+\]\(#[^)]*\)\s*$", "", text, flags=re.M)
+    text = re.sub(r"^\s*(-{3,}|\*{3,}|_{3,})\s*$", "", text, flags=re.M)
+
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+
+def _sections(text: str) -> list[tuple[str, str]]:
+    sections, title, lines, in_code = [], "", [], False
+    for line in text.splitlines():
+        if line.startswith("```"):
+            in_code = not in_code
+
+        heading = None if in_code else HEADING.match(line)
+        if heading:
+            sections.append((title, "\n".join(lines).strip()))
+            title, lines = heading.group(2).strip(), [line]
+            continue
+
+        lines.append(line)
+
+    sections.append((title, "\n".join(lines).strip()))
+    return [(title, body) for title, body in sections if body]
+
+
+def _priority(index: int, title: str) -> int:
+    # La introducción (con o sin el título del proyecto) es lo que mejor lo describe
+    if index == 0:
+        return 4
+
+    for value, pattern in PRIORITY:
+        if pattern.search(title):
+            return value
+
+    return 0
+
+
+def compact(text: str, budget: int, step: str = None) -> str:
+    """
+    Limpia el README y rellena el presupuesto de tokens con las secciones de más valor,
+    conservando su orden original. Registra los tokens antes y después.
+    """
+    if not text:
+        return ""
+
+    sections = [
+        (index, title, body) for index, (title, body) in enumerate(_sections(clean(text)))
+        if not (title and DROP_SECTIONS.search(title))
+    ]
+
+    ranked = sorted(sections, key=lambda section: (-_priority(section[0], section[1]), section[0]))
+
+    chosen, used = set(), 0
+    for index, title, body in ranked:
+        tokens = count_tokens(body)
+        if used + tokens <= budget:
+            chosen.add(index)
+            used += tokens
+
+        elif not chosen:
+            # Ni la primera sección cabe entera: se recorta al presupuesto
+            sections = [(index, title, body[:budget * 4])]
+            chosen.add(index)
+            break
+
+    result = "\n\n".join(body for index, _, body in sections if index in chosen)
+    log_techAI.info(
+        f"[{step or 'readme'}] README compactado: {count_tokens(text)} → {count_tokens(result)} tokens "
+        f"(presupuesto {budget})."
+    )
+    return result
@@ -0,0 +1,140 @@
+from datetime import datetime, timedelta
+
+from modules import database
+from modules.config import log_feeds, settings
+
+
+SCHEDULE_DATA   = settings.get('NEWS', {}).get('schedule', {})
+ENABLED         = SCHEDULE_DATA.get('enabled', True)
+BASE_DAYS       = SCHEDULE_DATA.get('base_days', 7)          # Intervalo inicial entre lecturas
+MIN_DAYS        = SCHEDULE_DATA.get('min_days', 1)           # Intervalo de las fuentes más productivas
+MAX_DAYS        = SCHEDULE_DATA.get('max_days', 56)          # Intervalo máximo de una fuente inactiva
+HIGH_YIELD      = SCHEDULE_DATA.get('high_yield', 2)         # Noticias aceptadas para acortar el intervalo
+RETIRE_FAILURES = SCHEDULE_DATA.get('retire_failures', 4)    # Fallos seguidos para retirar un feed
+RETIRE_DORMANT  = SCHEDULE_DATA.get('retire_dormant', 8)     # Lecturas seguidas sin noticias para retirarlo
+
+
+def _new_schedule(source_id: int, now: datetime) -> database.SourceSchedule:
+    # Hasta que se puntúe, la fuente sigue tocando: una ejecución fallida no la deja sin programar
+    return database.SourceSchedule(
+        id=source_id, interval_days=BASE_DAYS, next_poll_at=now,
+        failures=0, dormant=0, fetched=0, failed=0, latency=0.0
+    )
+
+
+def due(sources: list) -> list:
+    """ Fuentes a leer en esta ejecución: sin historial o con la próxima lectura vencida, nunca las retiradas. """
+    if not ENABLED:
+        return sources
+
+    now = datetime.now()
+    schedules = database.get_source_schedules()
+    selected = [
+        source for source in sources
+        if source.id not in schedules
+        or (schedules[source.id].retired_at is None
+            and (schedules[source.id].next_poll_at is None or schedules[source.id].next_poll_at <= now))
+    ]
+
+    log_feeds.info(f"Fuentes programadas: {len(selected)}/{len(sources)} tocan en esta ejecución.")
+    return selected
+
+
+def record_fetch(results: list):
+    """ Guarda el resultado de la descarga de cada feed; la puntuación se calcula en `record_yield`. """
+    if not ENABLED:
+        return
+
+    schedules = database.get_source_schedules()
+    now, updated = datetime.now(), []
+
+    for result in results:
+        schedule = schedules.get(result["source"].id) or _new_schedule(result["source"].id, now)
+        schedule.polled_at = now
+        schedule.fetched = len(result["items"])
+        schedule.failed = int(result["error"] is not None)
+        schedule.latency = result["elapsed"]
+        updated.append(schedule)
+
+    database.save_source_schedules(updated)
+
+
+def _score(previous: int, accepted: int, duplicates: int, failed: bool, latency: float) -> int:
+    # Media móvil: noticias aceptadas suman; duplicados, fallos y lentitud (1 punto por segundo) restan
+    run = 10 * accepted - 5 * duplicates - 10 * failed - min(10, latency)
+    return max(0, min(100, round(0.7 * (previous or 0) + 0.3 * run)))
+
+
+def record_yield(news_week: list, unique: list) -> dict:
+    """
+    Puntúa las fuentes leídas desde la última puntuación según su rendimiento y programa
+    su siguiente lectura: las productivas se leen más a menudo, las inactivas o con fallos
+    esperan el doble cada vez y las que no responden o no aportan nada se retiran.
+    """
+    if not ENABLED:
+        return {}
+
+    ranked, accepted = {}, {}
+    for item in news_week:
+        ranked[item["source_id"]] = ranked.get(item["source_id"], 0) + 1
+
+    for item in unique:
+        accepted[item["source_id"]] = accepted.get(item["source_id"], 0) + 1
+
+    sources = {source.id: source for source in database.get_news_sources()}
+    now, updated, scores, summary = datetime.now(), [], {}, {}
+
+    for schedule in database.get_source_schedules().values():
+        if schedule.polled_at is None or (schedule.scored_at and schedule.scored_at >= schedule.polled_at):
+            continue
+
+        source = sources.get(schedule.id)
+        if source is None:
+            continue
+
+        kept = accepted.get(schedule.id, 0)
+        duplicates = ranked.get(schedule.id, 0) - kept
+        # Un feed caído que la búsqueda web ha suplido con noticias aceptadas no cuenta como fallo
+        failed = bool(schedule.failed) and kept == 0
+
+        if failed:
+            schedule.failures += 1
+            schedule.interval_days = min(MAX_DAYS, schedule.interval_days * 2)
+
+        elif kept == 0:
+            schedule.failures = 0
+            schedule.dormant += 1
+            schedule.interval_days = min(MAX_DAYS, schedule.interval_days * 2)
+
+        else:
+            schedule.failures = schedule.dormant = 0
+            schedule.interval_days = (
+                max(MIN_DAYS, schedule.interval_days / 2) if kept >= HIGH_YIELD
+                else min(schedule.interval_days, BASE_DAYS)
+            )
+
+        scores[schedule.id] = _score(source.score, kept, duplicates, failed, schedule.latency)
+        schedule.next_poll_at = now + timedelta(days=schedule.interval_days)
+        schedule.scored_at = now
+
+        if schedule.failures >= RETIRE_FAILURES or schedule.dormant >= RETIRE_DORMANT:
+            schedule.retired_at = now
+            scores[schedule.id] = 0
+            log_feeds.warning(
+                f"[{source.name}] Fuente retirada ({schedule.failures} fallos, {schedule.dormant} lecturas sin noticias)."
+            )
+
+        summary[source.name] = {
+            "accepted": kept,
+            "duplicates": duplicates,
+            "failed": failed,
+            "score": scores[schedule.id],
+            "interval_days": schedule.interval_days,
+            "retired": schedule.retired_at is not None,
+        }
+        updated.append(schedule)
+
+    database.save_source_schedules(updated)
+    database.update_source_scores(scores)
+    log_feeds.info(f"Programación actualizada para {len(updated)} fuentes.")
+    return summary
@@ -0,0 +1,151 @@
+import json
+import uuid
+import asyncio
+import hashlib
+import inspect
+
+from datetime import datetime, timedelta
+
+from modules import database
+from modules.config import log_techAI, settings
+
+
+PIPELINE_DATA = settings.get('PIPELINE', {})
+RESUME_WINDOW = timedelta(hours=PIPELINE_DATA.get('resume_hours', 24))   # Antigüedad máxima de una ejecución reanudable
+# Ventanas propias por pipeline: NEWS se lanza con la misma entrada y su ejecución fallida
+# debe poder reanudarse en la siguiente programada en vez de repetir las llamadas de investigación
+RESUME_HOURS  = PIPELINE_DATA.get('resume_hours_per_pipeline', {"NEWS": 192})
+STALE_AFTER   = timedelta(minutes=PIPELINE_DATA.get('stale_minutes', 120))  # Intento en curso que se da por caído
+
+INPUT = "data"      # Nombre reservado para la entrada del pipeline
+
+
+class Step:
+    """
+    Nodo del grafo de un pipeline.
+    `func` recibe, en orden, las salidas de los pasos de `args`; `after` solo impone orden.
+    Con `map_over=True` la función se aplica a cada elemento del primer argumento, hasta
+    `concurrency` a la vez, guardando un checkpoint por elemento y descartando los `None`.
+    """
+
+    def __init__(self, name: str, func, args: tuple = (), after: tuple = (),
+                 map_over: bool = False, concurrency: int = 1):
+        self.name = name
+        self.func = func
+        self.args = tuple(args)
+        self.deps = tuple(args) + tuple(after)
+        self.map_over = map_over
+        self.concurrency = concurrency
+
+
+def input_hash(data) -> str:
+    canonical = json.dumps(data, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+async def _call(func, *args):
+    result = func(*args)
+    return await result if inspect.isawaitable(result) else result
+
+
+def _checkpoint(run_id: str, key: str, outputs: dict, value):
+    outputs[key] = value
+    database.save_step_checkpoint(database.StepCheckpoints(
+        run_id=run_id,
+        step=key,
+        output=json.dumps(value, ensure_ascii=False, default=str),
+        created_at=datetime.now()
+    ))
+
+
+async def _execute(run_id: str, step: Step, outputs: dict):
+    args = [outputs[name] for name in step.args]
+
+    if not step.map_over:
+        log_techAI.debug(f"[{step.name}] Ejecutando paso...")
+        _checkpoint(run_id, step.name, outputs, await _call(step.func, *args))
+        return
+
+    items, rest = args[0], args[1:]
+    semaphore = asyncio.Semaphore(step.concurrency)
+
+    async def run_item(index, item):
+        key = f"{step.name}[{index}]"
+        if key in outputs:
+            return outputs[key]
+
+        async with semaphore:
+            _checkpoint(run_id, key, outputs, await _call(step.func, item, *rest))
+
+        return outputs[key]
+
+    results = await asyncio.gather(
+        *(run_item(index, item) for index, item in enumerate(items)), return_exceptions=True
+    )
+
+    errors = [result for result in results if isinstance(result, BaseException)]
+    if errors:
+        raise errors[0]
+
+    _checkpoint(run_id, step.name, outputs, [result for result in results if result is not None])
+
+
+async def run(pipeline: str, steps: list[Step], data, result: str = None):
+    """
+    Ejecuta el grafo de pasos guardando un checkpoint de cada salida en SQLite.
+    Una ejecución fallida o interrumpida con la misma entrada se reanuda desde lo ya
+    completado; los pasos cuyas dependencias están resueltas se lanzan a la vez.
+    Devuelve la salida del paso `result` (por defecto, el último).
+    """
+    digest = input_hash(data)
+    now = datetime.now()
+    window = timedelta(hours=RESUME_HOURS[pipeline]) if pipeline in RESUME_HOURS else RESUME_WINDOW
+
+    # Las ejecuciones que ya no se pueden reanudar sueltan sus checkpoints
+    expired = database.expire_pipeline_runs(pipeline, now - window)
+    if expired:
+        log_techAI.info(f"[{pipeline}] {expired} ejecuciones sin reanudar caducadas.")
+
+    run_id = database.claim_pipeline_run(pipeline, digest, now - window, now - STALE_AFTER)
+
+    if run_id is not None:
+        outputs = database.get_step_checkpoints(run_id)
+        log_techAI.info(f"[{pipeline}] Reanudando la ejecución {run_id} con {len(outputs)} checkpoints.")
+
+    else:
+        # Las ejecuciones en curso con la misma entrada no se comparten: cada una tiene sus checkpoints
+        run_id = uuid.uuid4().hex
+        database.save_pipeline_run(database.PipelineRuns(
+            id=run_id,
+            pipeline=pipeline,
+            input_hash=digest,
+            status="running",
+            started_at=now,
+            attempt_at=now
+        ))
+        outputs = {}
+
+    outputs[INPUT] = data
+    pending = [step for step in steps if step.name not in outputs]
+
+    try:
+        while pending:
+            ready = [step for step in pending if all(dep in outputs for dep in step.deps)]
+            if not ready:
+                raise RuntimeError(f"Dependencias sin resolver: {[step.name for step in pending]}")
+
+            # Si un paso falla, los que corren a la vez terminan y dejan su checkpoint
+            results = await asyncio.gather(*(_execute(run_id, step, outputs) for step in ready), return_exceptions=True)
+            errors = [result for result in results if isinstance(result, BaseException)]
+            if errors:
+                raise errors[0]
+
+            pending = [step for step in pending if step not in ready]
+
+    except BaseException:
+        database.finish_pipeline_run(run_id, "failed")
+        log_techAI.error(f"[{pipeline}] Ejecución {run_id} interrumpida; se reanudará en el próximo intento.")
+        raise
+
+    database.finish_pipeline_run(run_id, "done")
+    return outputs[result or steps[-1].name]
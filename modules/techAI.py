@@ -1,27 +1,28 @@
 import re
 import json
 import httpx
-import requests
+import asyncio
+import hashlib
 
 from typing import Any
+from pathlib import Path
+from collections import OrderedDict
 from enum   import Enum, auto
 
 from dateutil.parser import isoparse
 from datetime import datetime, timedelta
 
-from sqlalchemy.exc import IntegrityError
-
-from modules import database
+from modules import database, dedup, feeds, github, http_client, metrics, llm_cache, llm_client, markdown_lint, readme_compact, source_schedule, steps
 from modules.config import log_techAI, settings
 
 from openai import AsyncOpenAI, RateLimitError
-from openai.types.responses import ResponseOutputMessage, ResponseOutputText
+from openai.types.responses import Response, ResponseOutputMessage, ResponseOutputText
 
 
 API_KEY = settings['OPENAI']['API-KEY']
 
 # ---------- OPENAI -------------
-aclient = AsyncOpenAI(api_key=API_KEY)
+aclient = AsyncOpenAI(api_key=API_KEY, max_retries=0)    # Los reintentos los gestiona llm_client
 MAX_TOKENS = 8192
 CAPABILITIES = {
     "chat":     {"model": "gpt-4o", "max_output_tokens": True,  "tool_choice": True, "search": False, "reasoner": False},
@@ -31,6 +32,29 @@ CAPABILITIES = {
     "research": {"model": "o4-mini-deep-research", "max_output_tokens": False, "tool_choice": False, "search": True, "reasoner": False},
 }
 
+# ---------- NOTICIAS -------------
+NEWS_DATA           = settings.get('NEWS', {})
+EXTRACT_CONCURRENCY = NEWS_DATA.get('extract_concurrency', 4)    # Fuentes procesadas a la vez
+SOURCE_TIMEOUT      = NEWS_DATA.get('source_timeout', 300)       # Segundos máximos por fuente
+LOCAL_FEEDS         = NEWS_DATA.get('local_feeds', True)         # Lee los feeds en local en vez de con el LLM
+MAX_SHORTLIST       = NEWS_DATA.get('max_shortlist', 200)        # Titulares máximos enviados a clasificar
+GEN_CONCURRENCY     = NEWS_DATA.get('gen_concurrency', 2)        # Noticias redactadas a la vez
+DEDUP_DAYS          = NEWS_DATA.get('dedup_days', 14)            # Días de noticias publicadas contra los que deduplicar
+# Temáticas con las que se resume el catálogo de fuentes en el prompt
+SOURCE_TOPICS       = NEWS_DATA.get('source_topics', [
+    "Python", "Java", "JavaScript", "TypeScript", "CSS", "HTML", "React", "Spring",
+    "Angular", "Astro", "Vue", "OpenAI", "Gemini", "Claude"
+])
+
+# ---------- BATCH API -------------
+BATCH_DATA    = settings['OPENAI'].get('batch', {})
+BATCH_ENABLED = BATCH_DATA.get('enabled', False)
+BATCH_WINDOW  = BATCH_DATA.get('completion_window', "24h")
+BATCH_DIR     = Path(__file__).parent / ".." / "data" / "batches"
+
+# `base_url` permite apuntar a un servidor local (modules/batch_stub.py) para pruebas sin conexión
+batch_client = AsyncOpenAI(api_key=API_KEY, base_url=BATCH_DATA['base_url']) if BATCH_DATA.get('base_url') else aclient
+
 New_CAPABILITIES = {
     "chat": {"search": False, "reasoner": False},
     "reasoner": {"search": False, "reasoner": True},
@@ -65,6 +89,17 @@ def _extract_json(text: str) -> dict | Any:
     return {}
 
 
+def _output_text(response) -> str | None:
+    data = None
+    for entry in response.output:
+        if isinstance(entry, ResponseOutputMessage) or entry.type == "message":
+            for chunk in entry.content:
+                if isinstance(chunk, ResponseOutputText) or chunk.type == "output_text":
+                    data = chunk.text
+
+    return data
+
+
 def build_kwargs(*, config: str, system: str, user: str):
     caps = CAPABILITIES[config]
     kwargs = {
@@ -134,27 +169,57 @@ def new_build_kwargs(*, config: str, system: str, user: str):
 
 
 # ---------- HELPERS ----------
-async def _chat(system: str, user: str) -> str:
+def _chat_request(system: str, user: str) -> dict:
+    return {
+        "model": "gpt-4o",
+        "temperature": 0.7,
+        "messages": [
+            {"role": "system", "content": system},
+            {"role": "user", "content": user}
+        ]
+    }
+
+
+async def _chat(system: str, user: str, step: str = None) -> str:
+    request = _chat_request(system, user)
+
+    key = None
+    if llm_cache.enabled(step):
+        key = llm_cache.make_key(request)
+        cached = llm_cache.lookup(step, key)
+        if cached is not None:
+            return cached
+
     try:
-        response = await aclient.chat.completions.create(
-            model="gpt-4o",
-            temperature=0.7,
-            messages=[
-                {"role": "system", "content": system},
-                {"role": "user", "content": user}
-            ]
-        )
+        response = await llm_client.call(aclient.chat.completions.create, request, "chat.completions", step)
 
-        return response.choices[0].message.content
+        content = response.choices[0].message.content
+        if key is not None and content:
+            tokens = response.usage.total_tokens if response.usage else 0
+            llm_cache.store(step, key, request["model"], content, tokens)
+
+        return content
 
     except Exception as e:
         log_techAI.error("Error durante la ejecución de chat completion: %s", e)
         raise
 
 
-async def _response(payload: dict):
+async def _response(payload: dict, step: str = None):
+    key = None
+    if llm_cache.enabled(step):
+        key = llm_cache.make_key(payload)
+        cached = llm_cache.lookup(step, key)
+        if cached is not None:
+            return Response.model_validate_json(cached)
+
     try:
-        response = await aclient.responses.create(**payload)
+        response = await llm_client.call(aclient.responses.create, payload, "responses", step)
+
+        if key is not None:
+            tokens = response.usage.total_tokens if response.usage else 0
+            llm_cache.store(step, key, payload["model"], response.model_dump_json(), tokens)
+
         return response
 
     except RateLimitError as e:
@@ -166,41 +231,195 @@ async def _response(payload: dict):
         raise
 
 
+async def _stream_chat(system: str, user: str, step: str = None):
+    """ Igual que `_chat` pero va devolviendo los fragmentos de texto según llegan. """
+    request = {**_chat_request(system, user), "stream_options": {"include_usage": True}}
+
+    key = None
+    if llm_cache.enabled(step):
+        key = llm_cache.make_key(_chat_request(system, user))
+        cached = llm_cache.lookup(step, key)
+        if cached is not None:
+            yield cached
+            return
+
+    parts, tokens = [], 0
+    async for chunk in llm_client.stream(aclient.chat.completions.create, request, "chat.completions", step):
+        if chunk.usage is not None:
+            tokens = chunk.usage.total_tokens
+
+        if chunk.choices and chunk.choices[0].delta.content:
+            parts.append(chunk.choices[0].delta.content)
+            yield chunk.choices[0].delta.content
+
+    if key is not None and parts:
+        llm_cache.store(step, key, request["model"], "".join(parts), tokens)
+
+
+async def _stream_response(payload: dict, step: str = None):
+    """ Igual que `_response` pero va devolviendo los fragmentos de texto según llegan. """
+    key = None
+    if llm_cache.enabled(step):
+        key = llm_cache.make_key(payload)
+        cached = llm_cache.lookup(step, key)
+        if cached is not None:
+            yield _output_text(Response.model_validate_json(cached)) or ""
+            return
+
+    async for event in llm_client.stream(aclient.responses.create, payload, "responses", step):
+        if event.type == "response.output_text.delta":
+            yield event.delta
+
+        elif event.type == "response.completed" and key is not None:
+            tokens = event.response.usage.total_tokens if event.response.usage else 0
+            llm_cache.store(step, key, payload["model"], event.response.model_dump_json(), tokens)
+
+
 # ---------- TOOLS ----------
-# - Obtiene README del repo
-async def tool_fetch_readme(repo_meta: dict) -> str:
-    log_techAI.info("Obteniendo README...")
+# - Descarga el README; devuelve {"status", "text", "url", "etag"}
+README_CACHE_SIZE = 256
+_readme_cache = OrderedDict()   # URL -> (etag, texto) para revalidar con If-None-Match
+
+
+async def _race_raw_readme(client: httpx.AsyncClient, owner_repo: str) -> dict | None:
+    candidates = [
+        f"https://raw.githubusercontent.com/{owner_repo}/HEAD/README.md",
+        f"https://raw.githubusercontent.com/{owner_repo}/HEAD/README.rst",
+        f"https://raw.githubusercontent.com/{owner_repo}/HEAD/README"
+    ]
+
+    async def fetch(raw_url):
+        try:
+            with metrics.upstream("github", "readme"):
+                return await client.get(raw_url)
+
+        except httpx.RequestError:
+            return None
+
+    # Se piden todas a la vez y se elige la primera válida por orden de preferencia
+    responses = await asyncio.gather(*(fetch(raw_url) for raw_url in candidates))
+    for raw_url, r in zip(candidates, responses):
+        if r is not None and r.status_code == 200 and len(r.text.strip()) > 20:
+            return {"status": 200, "text": r.text, "url": raw_url, "etag": r.headers.get("etag")}
+
+    return None
+
+
+async def _fetch_readme(repo_meta: dict, etag: str = None) -> dict:
+    url = repo_meta.get("url", "")
+    if not url:
+        return {"status": 404, "text": "", "url": None, "etag": None}
+
+    owner_repo = "/".join(url.rstrip("/").split("/")[-2:])
+    api_url = f"https://api.github.com/repos/{owner_repo}/readme"
+    client = http_client.get_client()
+
+    cached = _readme_cache.get(api_url)
+    headers = {**github.HEADERS, "Accept": "application/vnd.github.raw+json"}
+    if etag or cached:
+        headers["If-None-Match"] = etag or cached[0]
 
     try:
-        url = repo_meta.get("url", "")
-        if not url:
-            return ""
-
-        owner_repo = "/".join(url.rstrip("/").split("/")[-2:])
-        candidates = [
-            f"https://raw.githubusercontent.com/{owner_repo}/HEAD/README.md",
-            f"https://raw.githubusercontent.com/{owner_repo}/HEAD/README.rst",
-            f"https://raw.githubusercontent.com/{owner_repo}/HEAD/README"
-        ]
+        with metrics.upstream("github", "readme"):
+            r = await client.get(api_url, headers=headers)
+
+        if r.status_code == 304:
+            # Con ETag externo y sin copia local, el llamante ya conoce el contenido
+            text = cached[1] if cached and cached[0] == headers["If-None-Match"] else None
+            return {"status": 304, "text": text, "url": api_url, "etag": headers["If-None-Match"]}
+
+        if r.status_code == 200 and len(r.text.strip()) > 20:
+            _readme_cache[api_url] = (r.headers.get("etag"), r.text)
+            _readme_cache.move_to_end(api_url)
+            while len(_readme_cache) > README_CACHE_SIZE:
+                _readme_cache.popitem(last=False)
+
+            return {"status": 200, "text": r.text, "url": api_url, "etag": r.headers.get("etag")}
+
+    except httpx.RequestError as e:
+        log_techAI.warning("Error consultando /readme de GitHub: %s", e)
+
+    # Sin API (token, límite de tasa...) se compiten los README en bruto
+    raw = await _race_raw_readme(client, owner_repo)
+    if raw is not None:
+        return raw
 
-        async with httpx.AsyncClient(timeout=10) as client:
-            for raw_url in candidates:
-                try:
-                    r = await client.get(raw_url)
-                    if r.status_code == 200 and len(r.text.strip()) > 20:
-                        return r.text
+    log_techAI.warning("No se encontró un README válido en las URLs candidatas.")
+    return {"status": 404, "text": "", "url": None, "etag": None}
 
-                except httpx.RequestError:
-                    pass
 
-        log_techAI.warning("No se encontró un README válido en las URLs candidatas.")
-        return ""
+# - Obtiene README del repo
+async def tool_fetch_readme(repo_meta: dict) -> str:
+    log_techAI.info("Obteniendo README...")
+
+    try:
+        readme = await _fetch_readme(repo_meta)
+        return readme["text"] or ""
 
     except Exception as e:
         log_techAI.error("Error obteniendo README: %s", e)
         raise
 
 
+# - Huella de las entradas de un post: metadatos que cambian el contenido y hash del README
+FINGERPRINT_FIELDS = ("name", "description", "url", "language")
+
+def _hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _fingerprint(repo_meta: dict, readme_hash: str) -> str:
+    fields = {field: repo_meta.get(field) for field in FINGERPRINT_FIELDS}
+    return _hash_text(json.dumps({"meta": fields, "readme": readme_hash}, sort_keys=True))
+
+
+# - Guarda la huella del post recién generado
+def _save_fingerprint(repo_meta: dict, readme: str):
+    readme_hash = _hash_text(readme)
+    state = database.get_post_fingerprint(repo_meta["id"]) or database.PostFingerprints(id=repo_meta["id"])
+
+    # El ETag solo sigue siendo válido si describe el mismo README
+    if state.readme_hash != readme_hash:
+        state.readme_etag = None
+
+    state.readme_hash = readme_hash
+    state.fingerprint = _fingerprint(repo_meta, readme_hash)
+    state.checked_at = datetime.now()
+    database.save_post_fingerprint(state)
+
+
+# - Comprueba si las entradas del post han cambiado con una petición condicional del README
+async def tool_check_changes(repo_meta: dict) -> bool:
+    log_techAI.info("Comprobando cambios del repositorio...")
+
+    state = database.get_post_fingerprint(repo_meta["id"]) or database.PostFingerprints(id=repo_meta["id"])
+
+    readme = await _fetch_readme(repo_meta, etag=state.readme_etag)
+    if readme["status"] == 304 and readme["text"] is None:
+        log_techAI.debug("README sin cambios (304).")
+        readme_hash = state.readme_hash
+
+    else:
+        readme_hash = _hash_text(readme["text"])
+
+    state.readme_url = readme["url"]
+    state.readme_etag = readme["etag"]
+    state.readme_hash = readme_hash
+    state.checked_at = datetime.now()
+    fingerprint = _fingerprint(repo_meta, readme_hash)
+
+    if state.fingerprint is None:
+        # Primera comprobación: se siembra la huella y se aplica el criterio por fecha
+        state.fingerprint = fingerprint
+        database.save_post_fingerprint(state)
+
+        last_date = isoparse(repo_meta['updated_at'])
+        return last_date > datetime.now() - timedelta(days=7)
+
+    database.save_post_fingerprint(state)
+    return fingerprint != state.fingerprint
+
+
 # - Analiza el repo y genera puntos clave [_chat]
 async def tool_analyze_repo(repo_meta: dict, readme: str) -> str:
     log_techAI.info("Analizando repositorio...")
@@ -211,18 +430,18 @@ async def tool_analyze_repo(repo_meta: dict, readme: str) -> str:
     )
 
     user = (
-        "Estos son los METADATOS de mi repositorio y su README sin procesar.\n\n"
+        "Estos son los METADATOS de mi repositorio y las secciones principales de su README.\n\n"
         "======== METADATOS ========\n"
         f"{json.dumps(repo_meta, ensure_ascii=False, indent=2)}\n\n"
         "======== README ========\n"
-        f"{readme[:800]}\n\n" # recorta a 8k  tokens approx 
+        f"{readme_compact.compact(readme, readme_compact.ANALYZE_BUDGET, step='tool_analyze_repo')}\n\n"
         "----\n\n"
         "1⃣ Resúmeme en bullet-points (máx 10) qué hace el proyecto.\n"
         "2⃣ Destaca cuál es el problema que resuelve y a quién beneficia."
     )
 
     try:
-        analysis = await _chat(sys, user)
+        analysis = await _chat(sys, user, step="tool_analyze_repo")
         return analysis
 
     except Exception as e:
@@ -243,7 +462,7 @@ Con base en los siguientes puntos clave, diseña una estructura Markdown:
 - sections: array[str] (subtítulos H2 en orden lógico, 3-6 elementos)
 """
     try:
-        response = await _chat(sys, user)
+        response = await _chat(sys, user, step="tool_generate_outline")
         json_pattern = re.compile(r'```json\n(.*?)```', re.DOTALL)
         outline = ''.join(json_pattern.findall(response)) or response
         return outline
@@ -254,8 +473,7 @@ Con base en los siguientes puntos clave, diseña una estructura Markdown:
 
 
 # - Escribe el post completo en Markdown [_response][reasoner]
-async def tool_write_post(outline_json: str, repo_meta: dict, readme: str) -> str:
-    log_techAI.info("Escribiendo el post completo...")
+def _write_post_prompt(outline_json: str, repo_meta: dict, readme: str) -> tuple[str, str]:
     sys = (
         "Eres el autor del repositorio, escribiendo un post profesional en primera persona. "
         "Estilo directo, cercano, con ejemplos de uso cuando proceda."
@@ -269,7 +487,7 @@ async def tool_write_post(outline_json: str, repo_meta: dict, readme: str) -> st
         f"{json.dumps(repo_meta, ensure_ascii=False, indent=2)}\n\n"
         
         "=== README (recortado) ===\n"
-        f"{readme[:4000]}\n\n"
+        f"{readme_compact.compact(readme, readme_compact.WRITE_BUDGET, step='tool_write_post')}\n\n"
         
         "- Redacta el artículo completo en Markdown.\n"
         "- Cada subtítulo del outline debe ser un encabezado H2.\n"
@@ -278,8 +496,15 @@ async def tool_write_post(outline_json: str, repo_meta: dict, readme: str) -> st
         "- Termina con una línea horizontal `---` y un call-to-action invitando a visitar el repo y enviar feedback.\n"
     )
 
+    return sys, user
+
+
+async def tool_write_post(outline_json: str, repo_meta: dict, readme: str) -> str:
+    log_techAI.info("Escribiendo el post completo...")
+    sys, user = _write_post_prompt(outline_json, repo_meta, readme)
+
     try:
-        response = await _response(build_kwargs(config="reasoner", system=sys, user=user))
+        response = await _response(build_kwargs(config="reasoner", system=sys, user=user), step="tool_write_post")
 
         data = None
         for entry in response.output:
@@ -296,15 +521,13 @@ async def tool_write_post(outline_json: str, repo_meta: dict, readme: str) -> st
 
 
 # - Limpia el Markdown final [_chat]
-async def tool_markdown_polish(draft_md: str) -> str:
-    log_techAI.info("Depurando el Markdown final...")
-    sys = (
-        "Eres un corrector de estilo Markdown. "
-        "Corrige formatos (encabezados, listas, code-blocks) sin cambiar el contenido."
-    )
-    user = draft_md
-    cleaned = await _chat(sys, user)
+POLISH_SYSTEM = (
+    "Eres un corrector de estilo Markdown. "
+    "Corrige formatos (encabezados, listas, code-blocks) sin cambiar el contenido."
+)
 
+
+def _ensure_cta(cleaned: str) -> str:
     # Asegura la línea separatoria + CTA
     if not re.search(r"^---\s*$", cleaned, flags=re.M):
         cleaned += "\n\n---\n¡Si te gusta el proyecto, pásate por el repo y deja tu feedback! ⭐️"
@@ -312,12 +535,74 @@ async def tool_markdown_polish(draft_md: str) -> str:
     return cleaned
 
 
+async def tool_markdown_polish(draft_md: str) -> str:
+    log_techAI.info("Depurando el Markdown final...")
+    cleaned = await _chat(POLISH_SYSTEM, draft_md, step="tool_markdown_polish")
+    return _ensure_cta(cleaned)
+
+
+# - Genera título, secciones y artículo en una sola llamada con salida estructurada [_response][reasoner]
+FAST_POST_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string"},
+        "sections": {"type": "array", "items": {"type": "string"}},
+        "markdown": {"type": "string"},
+    },
+    "required": ["title", "sections", "markdown"],
+    "additionalProperties": False,
+}
+
+
+async def tool_fast_post(repo_meta: dict, readme: str) -> dict:
+    log_techAI.info("Generando el post en una sola llamada...")
+    sys = (
+        "Eres el autor del repositorio, escribiendo un post profesional en primera persona singular. "
+        "Estilo directo, cercano, con ejemplos de uso cuando proceda."
+    )
+
+    user = (
+        "=== METADATOS ===\n"
+        f"{json.dumps(repo_meta, ensure_ascii=False, indent=2)}\n\n"
+
+        "=== README (secciones principales) ===\n"
+        f"{readme_compact.compact(readme, readme_compact.WRITE_BUDGET, step='tool_fast_post')}\n\n"
+
+        "- title: título del artículo (máx 80 caracteres, primera persona).\n"
+        "- sections: subtítulos H2 en orden lógico (3-6 elementos).\n"
+        "- markdown: artículo completo en Markdown, empezando por el título como H1 y con cada sección como H2.\n"
+        "- Explica qué hace el proyecto, qué problema resuelve y a quién beneficia.\n"
+        "- Incluye fragmentos de código relevantes si aportan valor.\n"
+        "- Mantén entre 400 y 800 palabras.\n"
+        "- Termina con una línea horizontal `---` y un call-to-action invitando a visitar el repo y enviar feedback.\n"
+    )
+
+    payload = build_kwargs(config="reasoner", system=sys, user=user)
+    payload["text"] = {"format": {"type": "json_schema", "name": "post", "schema": FAST_POST_SCHEMA, "strict": True}}
+
+    try:
+        response = await _response(payload, step="tool_fast_post")
+        return json.loads(_output_text(response))
+
+    except Exception as e:
+        log_techAI.error("Error generando el post en una sola llamada: %s", e)
+        raise
+
+
+# - Corrige el Markdown en local, sin llamada al LLM
+def tool_markdown_lint(draft: dict) -> str:
+    article, fixes = markdown_lint.lint(draft["markdown"], title=draft["title"])
+    log_techAI.info(f"Markdown corregido en local ({fixes} correcciones).")
+    return _ensure_cta(article)
+
+
 # - Obtiene enlaces de fuentes de noticias [_response][find]
 async def tool_source_news(sources: list = None) -> list:
     if sources is not None:
         return [sources]
 
     sources = database.get_news_sources()
+    catalog = feeds.summarize(sources, SOURCE_TOPICS)
     log_techAI.info("Obteniendo enlaces de fuentes de noticias...")
 
     model = """
@@ -349,7 +634,6 @@ async def tool_source_news(sources: list = None) -> list:
         "• Agregadores genéricos (Medium, Reddit, Hacker News, Dev.to, Substack personal, etc...).\n"
         "• Blogs puramente comerciales o de marketing, notas de prensa, patrocinios, webinars.\n"
         "• Anuncios de empleo, eventos, meetups, conferencias.\n"
-        "• Feeds que ya estén listados en «URLs almacenadas» o «URLs vetadas» (véase abajo).\n"
         "• Duplicados exactos o variantes http/https, con o sin www.\n\n"
 
         "## Formato estricto\n"
@@ -357,14 +641,15 @@ async def tool_source_news(sources: list = None) -> list:
         "• No incluyas más de un feed por dominio a menos que cubra proyectos distintos "
         "y claramente diferenciados.\n\n"
 
-        "### URLs almacenadas que NO debes incluir nuevamente:\n"
+        f"### Catálogo actual ({catalog['total']} fuentes)\n"
     )
 
-    # Añade las listas dinámicas de `sources` y `vetoed`:
-    sys += "\n".join(f"- {source.url}" for source in sources)
+    # Solo el recuento por temática: las fuentes ya almacenadas se descartan en local
+    sys += ", ".join(f"{topic}: {count}" for topic, count in catalog["topics"].items())
     sys += (
         "\n\n"
         "### Recordatorio final\n"
+        "• Prioriza las temáticas con menos fuentes en el catálogo.\n"
         "• Intenta tener una lista rica de contenido, no repitas temáticas\n."
         "• Centrate sobre todo en lenguajes de programación y frameworks."
         "• Devuelve **exclusivamente** el JSON pedido.\n"
@@ -375,7 +660,7 @@ async def tool_source_news(sources: list = None) -> list:
         "Proporciona una lista de entre 10 o 20 fuentes de noticias relacionadas con la programación.\n"
     )
 
-    response = await _response(build_kwargs(config="find", system=sys, user=user))
+    response = await _response(build_kwargs(config="find", system=sys, user=user), step="tool_source_news")
     data = None
     for entry in response.output:
         if isinstance(entry, ResponseOutputMessage) or entry.type == "message":
@@ -383,14 +668,22 @@ async def tool_source_news(sources: list = None) -> list:
                 if isinstance(chunk, ResponseOutputText) or chunk.type == "output_text":
                     data = chunk.text
 
-    sources = _extract_json(data)
+    proposed = [
+        url for entry in _extract_json(data).get('news_sources', [])
+        for url in (entry.values() if isinstance(entry, dict) else [entry])
+    ]
+    kept = feeds.exclude(proposed, sources)
 
-    log_techAI.info("Fuentes obtenidas:\n%s", sources.get('news_sources', []))
-    return sources.get('news_sources', [])
+    log_techAI.info("Fuentes obtenidas:\n%s", kept)
+    return [{f"url{index}": url for index, url in enumerate(kept, 1)}] if kept else []
 
 
 # - Normaliza las fuentes RSS [_response][find]
 async def tool_source_rss(sources: list) -> dict:
+    if not sources or not sources[0]:
+        log_techAI.info("No hay fuentes nuevas que normalizar.")
+        return {}
+
     log_techAI.info(f"Normalizando RSS de {len(sources[0])} fuentes:")
 
     model = {
@@ -424,7 +717,7 @@ async def tool_source_rss(sources: list) -> dict:
     for source in sources:
         user += f"- {source}\n"
 
-    response = await _response(build_kwargs(config="find", system=sys, user=user))
+    response = await _response(build_kwargs(config="find", system=sys, user=user), step="tool_source_rss")
     data = None
     for entry in response.output:
         if isinstance(entry, ResponseOutputMessage) or entry.type == "message":
@@ -439,46 +732,35 @@ async def tool_source_rss(sources: list) -> dict:
 
 # - Valida las fuentes RSS
 async def tool_validate_rss(sources: dict) -> str:
-    log_techAI.info("Validando RSS...")
-
-    count = 0
-    for source, data in sources.items():
-        count += 1
-
-        try:
-            resp = requests.get(data['rss'], timeout=10)
-
-        except Exception as e:
-            continue
-
-        if resp.status_code == 200:
-            log_techAI.info("Fuente %s disponible", source)
-
-            try:
-                new_source = database.NewsSource(
-                    name=source,
-                    url=data['url'],
-                    rss=data['rss'],
-                    added_at=datetime.now(),
-                    score=1
-                )
-
-                database.save_news_source(new_source)
-
-            except IntegrityError as e:
-                log_techAI.warning("Fuente ya almacenada: %s", source)
+    log_techAI.info(f"Validando {len(sources)} RSS...")
+
+    probes = await feeds.validate(sources)
+    valid = {name: data for name, data in probes.items() if data["valid"]}
+
+    saved = database.save_news_sources([
+        database.NewsSource(
+            name=name,
+            url=data['url'],
+            rss=data['rss'],
+            added_at=datetime.now(),
+            score=1
+        )
+        for name, data in valid.items()
+    ])
 
-            except Exception as e:
-                log_techAI.info("Error al guardar la fuente: %s", e)
-                raise e
+    # El tiempo de respuesta queda en el estado del feed de cada fuente nueva
+    if saved:
+        database.save_feed_states([
+            database.FeedState(id=source_id, response_time=valid[name]["elapsed"])
+            for name, source_id in saved.items()
+        ])
 
-    return f"Procesadas {count} fuentes válidas."
+    return f"Procesadas {len(probes)} fuentes: {len(valid)} válidas, {len(saved)} nuevas."
 
 
-# - Extrae las últimas noticias de la semana [_response][search]
-async def tool_extract_news() -> list:
-    sources = database.get_news_sources()
-    log_techAI.info(f"Extrayendo noticias de {len(sources)} fuentes...")
+# - Extrae noticias leyendo los feeds con el modelo de búsqueda web [_response][search]
+async def tool_search_news(sources: list) -> list:
+    log_techAI.info(f"Extrayendo noticias con búsqueda web de {len(sources)} fuentes...")
 
     today = datetime.now()
     seven_day = today - timedelta(days=7)
@@ -510,123 +792,323 @@ async def tool_extract_news() -> list:
         "• Si no hay noticias válidas, responde una lista vacia: []\n"
     )
 
-    news_week = []
-    count = 1
-    for source in sources:
+    semaphore = asyncio.Semaphore(EXTRACT_CONCURRENCY)
+
+    async def extract(source: database.NewsSource) -> list:
         user = (
             "Recopila noticias de programación de los últimos 7 días.\n"
             f"Fuente RSS: {source.rss}\n"
         )
 
-        log_techAI.info(f"({count}/{len(sources)}) {source.name}")
-        count += 1
+        try:
+            async with semaphore:
+                response = await asyncio.wait_for(
+                    _response(new_build_kwargs(config="search", system=sys, user=user), step="tool_search_news"),
+                    SOURCE_TIMEOUT
+                )
 
-        response = await _response(new_build_kwargs(config="search", system=sys, user=user))
-        data = None
-        for entry in response.output:
-            if isinstance(entry, ResponseOutputMessage) or entry.type == "message":
-                for chunk in entry.content:
-                    if isinstance(chunk, ResponseOutputText) or chunk.type == "output_text":
-                        data = chunk.text
+        except asyncio.TimeoutError:
+            log_techAI.error(f"[{source.name}] Tiempo agotado extrayendo noticias.")
+            return []
 
-        resources = _extract_json(data)
+        except Exception as e:
+            log_techAI.error(f"[{source.name}] Error extrayendo noticias: {e}")
+            return []
+
+        resources = _extract_json(_output_text(response))
         if not resources:
-            log_techAI.info("Fuente sin noticias válidas.")
-            continue
+            log_techAI.info(f"[{source.name}] Fuente sin noticias válidas.")
+            return []
 
-        source_id = database.get_source_id_by_name(source.name)
-        for i in range(len(resources)):
-            resources[i]["source_id"] = source_id
+        for resource in resources:
+            resource["source_id"] = source.id
 
-        log_techAI.info("Noticias obtenidas: %s", len(resources))
+        log_techAI.info(f"[{source.name}] Noticias obtenidas: {len(resources)}")
         log_techAI.debug(f"noticias:\n{resources}")
+        return resources
 
-        news_week.extend(resources)
+    # Cada fuente se agrega en cuanto termina; un fallo o un timeout no afecta al resto
+    news_week = []
+    for count, task in enumerate(asyncio.as_completed([extract(source) for source in sources]), start=1):
+        news_week.extend(await task)
+        log_techAI.debug(f"({count}/{len(sources)}) fuentes procesadas.")
 
     log_techAI.debug(f"news_week:\n{news_week}")
     return news_week
 
 
-# - Genera las publicaciones de las noticias [_response][research]
-async def tool_gen_news(news_week) -> list:
-    log_techAI.info(f"Generando publicaciones de {len(news_week)} noticias.")
+# - Traduce y filtra por relevancia los titulares preseleccionados en una sola llamada [_chat]
+async def tool_rank_news(items: list) -> list:
+    if not items:
+        return []
 
-    model = {
-        "sumary": {
-            "introduction": "Entradilla",
-            "content": "Contenido"
-        }
-    }
+    # Preselección determinista: los más recientes hasta el máximo configurado
+    items = sorted(items, key=lambda item: item["published_at"], reverse=True)[:MAX_SHORTLIST]
+    log_techAI.info(f"Clasificando {len(items)} titulares preseleccionados...")
+
+    model = [{"id": 0, "title": "Título de la noticia en español"}]
 
     sys = (
-        "Eres un redactor técnico especializado. "
-        "Debes acceder a la URL, leer la fuente original y generar un post compuesto por dos partes:\n"
-        " • Entradilla: un párrafo que haga de introducción la publicación.\n"
-        " • Contenido: Continuación de la entradilla dando mas detalles.\n\n"
-        
-        "Reglas de calidad:\n"
-        " • Sin inventar, todo debe venir de la fuente.\n"
-        " • Siempre visita la URL dada. Si la página no carga, responde con {}.\n"
-        " • Citas textuales, si las usas, máximo 20 palabras por cita.\n"
-        " • Estilo claro, conciso, neutral, ligeramente divulgativo.\n"
-        " • No añadas opiniones, sólo contexto comprobable.\n\n"
-
-        "Entradilla:\n"
-        " • Al rededor de 45–80 palabras.\n"
-        " • **No incluyas titulo ni fecha**.\n\n"
-
-        "Contenido ampliado:\n"
-        " • Al rededor de 300–600 palabras\n"
-        " • Continuación de la entradilla."
-        " • Usa Markdown como estilo\n\n"
-
-        "Método de salida:\n"
-        " • Debe ser **únicamente** en formato JSON.\n"
-        " • No agreges comentarios y texto adicional.\n"
-        " • Siempre traduce al español."
-        " • Usa la siguiente estructura:\n"
-        f"{json.dumps(model, ensure_ascii=False, indent=2)}\n"
+        "Eres un editor que selecciona titulares tecnológicos centrados en programación "
+        "(Python, Java, JavaScript, TypeScript, Go, Rust, etc.).\n\n"
+
+        "REGLAS DE FILTRADO\n"
+        "• Usa SOLO el título; no abras el artículo.\n"
+        "• Traduce el título al español si está en otro idioma.\n"
+        "• Descarta notas de prensa, anuncios de empleo, eventos o contenido puramente comercial.\n"
+        "• Prioriza versiones nuevas, vulnerabilidades críticas, frameworks o herramientas útiles para desarrolladores.\n\n"
+
+        "FORMATO DE RESPUESTA\n"
+        "• Devuelve ÚNICAMENTE una lista JSON (sin texto adicional) con los titulares aceptados y su id original.\n"
+        f"{json.dumps(model, ensure_ascii=False)}\n"
+        "• Si no hay titulares válidos, responde una lista vacia: []\n"
+    )
+
+    user = "\n".join(
+        json.dumps({"id": index, "title": item["title"]}, ensure_ascii=False)
+        for index, item in enumerate(items)
+    )
+
+    ranked = _extract_json(await _chat(sys, user, step="tool_rank_news"))
+    if not isinstance(ranked, list):
+        return []
+
+    news_week = []
+    for entry in ranked:
+        try:
+            item = items[int(entry["id"])]
+
+        except (KeyError, ValueError, TypeError, IndexError):
+            continue
+
+        # URL y fecha salen del feed; del modelo solo se toma la traducción
+        news_week.append({
+            "title": entry.get("title") or item["title"],
+            "url": item["url"],
+            "date": item["published_at"].strftime('%Y-%m-%d'),
+            "source_id": item["source_id"],
+        })
+
+    log_techAI.info(f"Titulares aceptados: {len(news_week)}/{len(items)}")
+    return news_week
+
+
+# - Extrae las últimas noticias de la semana leyendo los feeds en local
+async def tool_extract_news() -> list:
+    sources = source_schedule.due(database.get_news_sources())
+    log_techAI.info(f"Extrayendo noticias de {len(sources)} fuentes...")
+
+    if not sources:
+        return []
+
+    if not LOCAL_FEEDS:
+        news_week = await tool_search_news(sources)
+        # Sin feeds locales cada búsqueda cuenta como lectura, para puntuar y espaciar la fuente
+        source_schedule.record_fetch([
+            {"source": source, "items": [item for item in news_week if item["source_id"] == source.id],
+             "error": None, "elapsed": 0.0}
+            for source in sources
+        ])
+        return news_week
+
+    # Los 7 días solo se aplican a las fuentes sin marca de agua; el resto sigue desde su marca
+    today = datetime.now()
+    results = await feeds.ingest(sources, since=today - timedelta(days=7), until=today)
+    source_schedule.record_fetch(results)
+
+    shortlist = [
+        {**item, "source_id": result["source"].id}
+        for result in results if result["error"] is None
+        for item in result["items"]
+    ]
+    news_week = await tool_rank_news(shortlist)
+
+    # Las fuentes cuyo feed no se pudo leer recurren a la búsqueda web
+    failed = [result["source"] for result in results if result["error"] is not None]
+    if failed:
+        news_week.extend(await tool_search_news(failed))
+
+    log_techAI.debug(f"news_week:\n{news_week}")
+    return news_week
+
+
+# - Genera las publicaciones de las noticias [_response][research]
+NEWS_MODEL = {
+    "sumary": {
+        "introduction": "Entradilla",
+        "content": "Contenido"
+    }
+}
+
+NEWS_SYSTEM = (
+    "Eres un redactor técnico especializado. "
+    "Debes acceder a la URL, leer la fuente original y generar un post compuesto por dos partes:\n"
+    " • Entradilla: un párrafo que haga de introducción la publicación.\n"
+    " • Contenido: Continuación de la entradilla dando mas detalles.\n\n"
+
+    "Reglas de calidad:\n"
+    " • Sin inventar, todo debe venir de la fuente.\n"
+    " • Siempre visita la URL dada. Si la página no carga, responde con {}.\n"
+    " • Citas textuales, si las usas, máximo 20 palabras por cita.\n"
+    " • Estilo claro, conciso, neutral, ligeramente divulgativo.\n"
+    " • No añadas opiniones, sólo contexto comprobable.\n\n"
+
+    "Entradilla:\n"
+    " • Al rededor de 45–80 palabras.\n"
+    " • **No incluyas titulo ni fecha**.\n\n"
+
+    "Contenido ampliado:\n"
+    " • Al rededor de 300–600 palabras\n"
+    " • Continuación de la entradilla."
+    " • Usa Markdown como estilo\n\n"
+
+    "Método de salida:\n"
+    " • Debe ser **únicamente** en formato JSON.\n"
+    " • No agreges comentarios y texto adicional.\n"
+    " • Siempre traduce al español."
+    " • Usa la siguiente estructura:\n"
+    f"{json.dumps(NEWS_MODEL, ensure_ascii=False, indent=2)}\n"
+)
+
+
+def _news_payload(news: dict) -> dict:
+    user = (
+        "Genera un post de la siguiente url dada:\n"
+        f"URL: {news['url']}\n"
     )
 
+    return new_build_kwargs(config="research", system=NEWS_SYSTEM, user=user)
+
+
+def _apply_summary(news: dict, data: str | None) -> bool:
+    summary = _extract_json(data)
+    if not summary:
+        log_techAI.warning("Noticia descartada por el modelo.")
+        return False
+
+    try:
+        log_techAI.debug(f"Introduccion:\n{summary['sumary']['introduction']}")
+        news["introduction"] = summary["sumary"]["introduction"]
+
+        log_techAI.debug(f"Contenido:\n{summary['sumary']['content']}")
+        news["content"] = summary["sumary"]["content"]
+        return True
+
+    except Exception as e:
+        log_techAI.error(f"Error en la respuesta del modelo: {e}")
+        return False
+
+
+async def _gen_one_news(news: dict) -> dict | None:
+    if database.get_news_by_url(news["url"]):
+        log_techAI.warning("Noticia ya generada.")
+        return None
+
+    log_techAI.info(f"Generando noticia para la url: {news['url']}")
+
+    response = await _response(_news_payload(news), step="tool_gen_news")
+    return news if _apply_summary(news, _output_text(response)) else None
+
+
+async def tool_gen_news(news_week) -> list:
+    log_techAI.info(f"Generando publicaciones de {len(news_week)} noticias.")
+
     posts_news = []
     for news in news_week:
-        user = (
-            "Genera un post de la siguiente url dada:\n"
+        if await _gen_one_news(news) is not None:
+            posts_news.append(news)
+
+    log_techAI.debug(f"posts_news:\n{posts_news}")
+    return posts_news
+
+
+# - Envía la generación de noticias a la Batch API [batch][research]
+async def tool_submit_news_batch(news_week) -> str | None:
+    pending = [news for news in news_week if not database.get_news_by_url(news["url"])]
+    if not pending:
+        log_techAI.info("No hay noticias nuevas que enviar en lote.")
+        return None
+
+    BATCH_DIR.mkdir(parents=True, exist_ok=True)
+    path = BATCH_DIR / f"news_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+
+    with open(path, "w", encoding="utf-8") as f:
+        for index, news in enumerate(pending):
+            line = {"custom_id": str(index), "method": "POST", "url": "/v1/responses", "body": _news_payload(news)}
+            f.write(json.dumps(line, ensure_ascii=False) + "\n")
+
+    with open(path, "rb") as f:
+        with metrics.upstream("openai", "files"):
+            input_file = await batch_client.files.create(file=f, purpose="batch")
+
+    with metrics.upstream("openai", "batches"):
+        batch = await batch_client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/responses",
+            completion_window=BATCH_WINDOW
         )
 
-        if database.get_news_by_url(news["url"]):
-            log_techAI.warning("Noticia ya generada.")
-            continue
+    database.save_news_batch(database.NewsBatches(
+        id=batch.id,
+        status=batch.status,
+        items=json.dumps(pending, ensure_ascii=False),
+        input_file=str(path),
+        created_at=datetime.now()
+    ))
 
-        log_techAI.info(f"Generando noticia para la url: {news['url']}")
-        user += f"URL: {news['url']}\n"
+    log_techAI.info(f"Lote {batch.id} enviado con {len(pending)} noticias.")
+    return batch.id
 
-        response = await _response(new_build_kwargs(config="research", system=sys, user=user))
-        data = None
-        for entry in response.output:
-            if isinstance(entry, ResponseOutputMessage) or entry.type == "message":
-                for chunk in entry.content:
-                    if isinstance(chunk, ResponseOutputText) or chunk.type == "output_text":
-                        data = chunk.text
 
-        summary = _extract_json(data)
-        if not summary:
-            log_techAI.warning("Noticia descartada por el modelo.")
+# - Recoge los lotes terminados y asigna los resultados a sus noticias
+async def tool_collect_news_batches() -> list:
+    posts_news = []
+
+    for record in database.get_pending_news_batches():
+        with metrics.upstream("openai", "batches"):
+            batch = await batch_client.batches.retrieve(record.id)
+
+        items = json.loads(record.items)
+        errors = []
+
+        if batch.status in ("validating", "in_progress", "finalizing"):
+            log_techAI.info(f"Lote {record.id} en curso ({batch.status}).")
             continue
 
-        try:
-            log_techAI.debug(f"Introduccion:\n{summary['sumary']['introduction']}")
-            news["introduction"] = summary["sumary"]["introduction"]
+        if batch.status == "completed" and (batch.output_file_id or batch.error_file_id):
+            # Las peticiones fallidas pueden venir en el fichero de salida (status_code != 200) o en el de errores
+            lines = []
+            for file_id in (batch.output_file_id, batch.error_file_id):
+                if file_id:
+                    with metrics.upstream("openai", "files"):
+                        lines.extend((await batch_client.files.content(file_id)).text.splitlines())
 
-            log_techAI.debug(f"Contenido:\n{summary['sumary']['content']}")
-            news["content"] = summary["sumary"]["content"]
+            for line in lines:
+                if not line.strip():
+                    continue
 
-            posts_news.append(news)
+                result = json.loads(line)
+                response = (result.get("response") or {})
+                news = items[int(result["custom_id"])]
 
-        except Exception as e:
-            log_techAI.error(f"Error en la respuesta del modelo: {e}")
+                if result.get("error") or response.get("status_code") != 200:
+                    error = result.get("error") or (response.get("body") or {}).get("error") or response.get("status_code")
+                    log_techAI.warning(f"Petición {result.get('custom_id')} del lote fallida: {error}")
+                    errors.append({"url": news["url"], "error": str(error)})
+                    continue
+
+                if _apply_summary(news, _output_text(Response.model_validate(response["body"]))):
+                    posts_news.append(news)
+
+            log_techAI.info(f"Lote {record.id} completado ({len(errors)} peticiones fallidas).")
+
+        else:
+            # Lote fallido, expirado o cancelado: se genera por la vía síncrona
+            log_techAI.warning(f"Lote {record.id} terminado con estado {batch.status}, usando la vía síncrona.")
+            posts_news.extend(await tool_gen_news(items))
+
+        database.finish_news_batch(record.id, batch.status, errors)
 
-    log_techAI.debug(f"posts_news:\n{posts_news}")
     return posts_news
 
 
@@ -642,49 +1124,111 @@ class Pipeline(Enum):
     POST = auto()     # Para generar posts
     SRCS = auto()     # Para obtener fuentes de noticias
     NEWS = auto()     # Para obtener noticias
+    FAST_POST = auto()  # Para generar posts con una sola llamada
+
+
+async def _weekly_news() -> list:
+    news_week = await tool_extract_news()
+    news_sorted = sorted(news_week, key=lambda x: datetime.strptime(x['date'], '%Y-%m-%d'))
+    log_techAI.info(json.dumps(news_sorted, ensure_ascii=False, indent=2))
+    return news_sorted
+
+
+# - Agrupa noticias casi duplicadas y deja una por grupo antes de generarlas
+def tool_dedup_news(news_sorted: list) -> list:
+    known = database.get_recent_news(datetime.now() - timedelta(days=DEDUP_DAYS))
+    unique = dedup.representatives(news_sorted, known)
+    log_techAI.info(f"Noticias únicas: {len(unique)}/{len(news_sorted)} (comparadas con {len(known)} publicadas).")
+    return unique
+
+
+# - Confirma las marcas de agua de los feeds una vez generadas las noticias
+def tool_commit_watermarks() -> int:
+    return feeds.commit_watermarks() if LOCAL_FEEDS else 0
+
+
+# - Puntúa las fuentes según su rendimiento y programa su siguiente lectura
+def tool_score_sources(news_sorted: list, unique: list) -> dict:
+    return source_schedule.record_yield(news_sorted, unique)
+
+
+async def _submit_or_generate(news_sorted: list) -> str | list | None:
+    """ Devuelve el ID del lote enviado, None si no había nada que enviar, o las noticias si se generan en síncrono. """
+    try:
+        # Los resultados se recogen más tarde con collect_news_batches
+        return await tool_submit_news_batch(news_sorted)
+
+    except Exception as e:
+        log_techAI.error("No se pudo enviar el lote, usando la vía síncrona: %s", e)
+        return await tool_gen_news(news_sorted)
+
+
+# Grafos de pasos: cada salida se guarda como checkpoint y un fallo se reanuda desde ahí
+GRAPHS = {
+    Pipeline.POST: [
+        steps.Step("readme", tool_fetch_readme, args=(steps.INPUT,)),
+        steps.Step("analysis", tool_analyze_repo, args=(steps.INPUT, "readme")),
+        steps.Step("outline", tool_generate_outline, args=("analysis",)),
+        steps.Step("post", tool_write_post, args=("outline", steps.INPUT, "readme")),
+        steps.Step("article", tool_markdown_polish, args=("post",)),
+        steps.Step("fingerprint", _save_fingerprint, args=(steps.INPUT, "readme"), after=("article",)),
+    ],
+    Pipeline.FAST_POST: [
+        steps.Step("readme", tool_fetch_readme, args=(steps.INPUT,)),
+        steps.Step("draft", tool_fast_post, args=(steps.INPUT, "readme")),
+        steps.Step("article", tool_markdown_lint, args=("draft",)),
+        steps.Step("fingerprint", _save_fingerprint, args=(steps.INPUT, "readme"), after=("article",)),
+    ],
+    Pipeline.SRCS: [
+        steps.Step("sources", tool_source_news, args=(steps.INPUT,)),
+        steps.Step("rss", tool_source_rss, args=("sources",)),
+        steps.Step("validated", tool_validate_rss, args=("rss",)),
+    ],
+    Pipeline.NEWS: [
+        steps.Step("news", _weekly_news),
+        steps.Step("unique", tool_dedup_news, args=("news",)),
+        steps.Step("schedule", tool_score_sources, args=("news", "unique")),
+        steps.Step("posts", _submit_or_generate, args=("unique",)) if BATCH_ENABLED else
+        steps.Step("posts", _gen_one_news, args=("unique",), map_over=True, concurrency=GEN_CONCURRENCY),
+        steps.Step("watermark", tool_commit_watermarks, after=("posts", "schedule")),
+    ],
+}
+
+RESULTS = {Pipeline.POST: "article", Pipeline.FAST_POST: "article", Pipeline.SRCS: "validated", Pipeline.NEWS: "posts"}
 
 
 async def _run_pipeline(data: dict | list, mode: Pipeline) -> str | list | None:
     log_techAI.info("Ejecutando el pipeline en modo: %s", mode.name)
+    # Se ejecuta en la tarea de quien llama: el contexto se restaura al terminar
+    token = llm_client.pipeline.set(mode.name)
+    try:
+        return await _dispatch(data, mode)
+
+    finally:
+        llm_client.pipeline.reset(token)
+
 
-    match mode:
-        # Para pruebas
-        case Pipeline.TEST:
-            pass
-
-        # Evaluación de actualización de repositorios
-        case Pipeline.EVAL:
-            last_date = isoparse(data['updated_at'])
-            if last_date > datetime.now() - timedelta(days=7):
-                log_techAI.warning("El repositorio ha sido actualizado recientemente.")
-                return True
-
-            log_techAI.info("No es necesario actualizar el Post.")
-            return False
-
-        # Generador de posts
-        case Pipeline.POST:
-            readme = await tool_fetch_readme(data)
-            analysis = await tool_analyze_repo(data, readme)
-            outline = await tool_generate_outline(analysis)
-            post = await tool_write_post(outline, data, readme)
-            cleaner = await tool_markdown_polish(post)
-            return cleaner
-
-        # Buscar y actualizar fuentes de noticias
-        case Pipeline.SRCS:
-            find_sources = await tool_source_news(data)
-            get_rss = await tool_source_rss(find_sources)
-            sources = await tool_validate_rss(get_rss)
-            return sources
-
-        # Extraer y generar noticias de la semana
-        case Pipeline.NEWS:
-            news_week = await tool_extract_news()
-            news_sorted = sorted(news_week, key=lambda x: datetime.strptime(x['date'], '%Y-%m-%d'))
-            log_techAI.info(json.dumps(news_sorted, ensure_ascii=False, indent=2))
-            posts_news = await tool_gen_news(news_sorted)
-            return posts_news
+async def _dispatch(data: dict | list, mode: Pipeline) -> str | list | None:
+    # Evaluación de actualización de repositorios
+    if mode == Pipeline.EVAL:
+        try:
+            changed = await tool_check_changes(data)
+
+        except Exception as e:
+            # Sin README no hay huella fiable: se recurre al criterio por fecha
+            log_techAI.warning("No se pudo comprobar la huella (%s), se usa la fecha.", e)
+            changed = isoparse(data['updated_at']) > datetime.now() - timedelta(days=7)
+
+        if changed:
+            log_techAI.warning("Las entradas del post han cambiado.")
+            return True
+
+        log_techAI.info("No es necesario actualizar el Post.")
+        return False
+
+    # Generador de posts, fuentes de noticias y noticias de la semana
+    if mode in GRAPHS:
+        return await steps.run(mode.name, GRAPHS[mode], data, result=RESULTS[mode])
 
     return None
 
@@ -696,15 +1240,17 @@ async def test_pipeline(mode: Pipeline) -> list:
 
 
 # ---------- GENERATE POST ----------
-async def gen_post(data, mode: Pipeline) -> str:
+async def gen_post(data, mode: Pipeline, no_cache: bool = False, post_mode: Pipeline = Pipeline.POST) -> str:
     log_techAI.info("Generando post...")
 
+    # Tras EVAL se genera con `post_mode` (POST o FAST_POST)
     if mode == Pipeline.EVAL:
         if not await _run_pipeline(data, mode):
             return None
 
-        mode = Pipeline.POST
+        mode = post_mode
 
+    token = llm_cache.bypass.set(no_cache)
     try:
         data = data if isinstance(data, dict) else json.loads(data)
         response = await _run_pipeline(data, mode)
@@ -718,6 +1264,50 @@ async def gen_post(data, mode: Pipeline) -> str:
         log_techAI.error("Error generando el post: %s", e)
         raise
 
+    finally:
+        llm_cache.bypass.reset(token)
+
+
+# ---------- STREAM POST ----------
+async def stream_post(data: dict, no_cache: bool = False):
+    """
+    Pipeline.POST en streaming. Produce tuplas (evento, datos):
+    ("step", ...) al terminar cada paso, ("delta", ...) con cada fragmento de texto de
+    tool_write_post y tool_markdown_polish, y ("done", {"article": ...}) con el post final.
+    """
+    # Se consume desde la tarea de streaming de la respuesta, cuyo contexto se descarta al terminar;
+    # no se restauran los valores porque el cierre puede ocurrir en otro contexto (desconexión)
+    llm_cache.bypass.set(no_cache)
+    llm_client.pipeline.set(Pipeline.POST.name)
+    log_techAI.info("Generando post en streaming...")
+
+    readme = await tool_fetch_readme(data)
+    yield "step", {"step": "tool_fetch_readme"}
+
+    analysis = await tool_analyze_repo(data, readme)
+    yield "step", {"step": "tool_analyze_repo"}
+
+    outline = await tool_generate_outline(analysis)
+    yield "step", {"step": "tool_generate_outline"}
+
+    post = []
+    system, user = _write_post_prompt(outline, data, readme)
+    async for delta in _stream_response(build_kwargs(config="reasoner", system=system, user=user), step="tool_write_post"):
+        post.append(delta)
+        yield "delta", {"step": "tool_write_post", "text": delta}
+
+    yield "step", {"step": "tool_write_post"}
+
+    cleaned = []
+    async for delta in _stream_chat(POLISH_SYSTEM, "".join(post), step="tool_markdown_polish"):
+        cleaned.append(delta)
+        yield "delta", {"step": "tool_markdown_polish", "text": delta}
+
+    yield "step", {"step": "tool_markdown_polish"}
+
+    _save_fingerprint(data, readme)
+    yield "done", {"article": _ensure_cta("".join(cleaned))}
+
 
 # ---------- GET SOURCES ----------
 async def get_sources(mode: Pipeline, sources: dict = None) -> str:
@@ -733,7 +1323,7 @@ async def get_sources(mode: Pipeline, sources: dict = None) -> str:
 
 
 # ---------- GET NEWS ----------
-async def get_news(mode: Pipeline) -> list:
+async def get_news(mode: Pipeline) -> list | str | None:
     log_techAI.info("Obteniendo noticias...")
 
     try:
@@ -743,4 +1333,16 @@ async def get_news(mode: Pipeline) -> list:
 
     except Exception as e:
         log_techAI.error("Error obteniendo noticias: %s", e)
-        raise
\ No newline at end of file
+        raise
+
+
+# ---------- COLLECT NEWS BATCHES ----------
+async def collect_news_batches() -> list:
+    log_techAI.info("Comprobando lotes de noticias pendientes...")
+
+    try:
+        return await tool_collect_news_batches()
+
+    except Exception as e:
+        log_techAI.error("Error recogiendo lotes de noticias: %s", e)
+        raise